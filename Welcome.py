@@ -1,5 +1,6 @@
 import streamlit as st
 from streamlit_option_menu import option_menu
+from utils.metrics import set_page
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(
@@ -8,6 +9,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="auto"
 )
+set_page("Welcome")
 
 # --- FUNCTION TO INJECT CSS AND BACKGROUND ---
 def inject_css_and_background():
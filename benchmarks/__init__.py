@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# Offline performance checks for the app. Run them from the repository root, e.g. `python -m benchmarks.startup`.
@@ -0,0 +1,269 @@
+# benchmarks/fakes.py
+"""
+Local stand-ins for Gemini and Pexels, so benchmarks run without keys or network.
+
+FakeGeminiModel answers like a GenerativeModel (plain text, JSON mode, the Translator's
+<<<n>>> markers, streaming, usage metadata). FakePexelsServer is a real HTTP server on
+localhost that serves search results and generated JPEGs. Both take a latency and an
+error rate; injected errors carry retryable status codes, so they exercise the app's
+retry path exactly like real 429/503 responses.
+"""
+import io
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+LOREM = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore "
+    "et dolore magna aliqua ut enim ad minim veniam quis nostrud exercitation ullamco laboris"
+).split()
+
+# One object with every key the app's JSON prompts ask for (SEO, social, image idea, outline)
+JSON_REPLY = {
+    "meta_description": "A concise meta description for the benchmark article.",
+    "keyword_analysis": "Keywords appear naturally in the introduction and two headings.",
+    "title_suggestion": "A Benchmark Title Worth Clicking",
+    "twitter": "Benchmark tweet #perf",
+    "linkedin": "Benchmark LinkedIn post.",
+    "facebook": "Benchmark Facebook post.",
+    "idea": "A calm workspace at sunrise.",
+    "prompt": "photorealistic workspace at sunrise, soft light, 35mm",
+    "title": "Benchmark Article",
+    "sections": [{"heading": f"Section {i}", "brief": "What this section covers."} for i in range(1, 6)],
+}
+MARKER = re.compile(r"<<<(\d+)>>>\n(.*?)(?=\n<<<\d+>>>|\n\s*$)", re.DOTALL)
+
+
+class FakeUpstreamError(Exception):
+    """Looks like a google-api-core error: carries an integer `code`."""
+
+    def __init__(self, code, message="injected error"):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+class _Usage:
+    def __init__(self, prompt, reply):
+        self.prompt_token_count = estimate_tokens(prompt)
+        self.candidates_token_count = estimate_tokens(reply)
+        self.total_token_count = self.prompt_token_count + self.candidates_token_count
+
+
+class FakeResponse:
+    def __init__(self, text, usage):
+        self.text = text
+        self.usage_metadata = usage
+
+
+class FakeStream:
+    """Iterates chunks with a `.text` like a streamed GenerateContentResponse."""
+
+    def __init__(self, chunks, usage, chunk_delay):
+        self._chunks = chunks
+        self._chunk_delay = chunk_delay
+        self.usage_metadata = usage
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            time.sleep(self._chunk_delay)
+            yield FakeResponse(chunk, None)
+
+
+# --- Fake Gemini ---
+class FakeGeminiModel:
+    """
+    Drop-in for genai.GenerativeModel. `latency` is the time to the first token, `output_words`
+    the length of free-text replies, `error_rate` the share of calls that raise a 503.
+    Counters (calls, errors, tokens) are kept for the benchmark report.
+    """
+
+    def __init__(self, model_name="models/fake-gemini", latency=0.05, output_words=300,
+                 error_rate=0.0, chunk_words=20, chunk_delay=0.002, seed=42):
+        self.model_name = model_name
+        self.latency = latency
+        self.output_words = output_words
+        self.error_rate = error_rate
+        self.chunk_words = chunk_words
+        self.chunk_delay = chunk_delay
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = self.errors = self.prompt_tokens = self.output_tokens = 0
+
+    def _reply(self, prompt, generation_config):
+        config = generation_config or {}
+        if config.get("response_mime_type") == "application/json":
+            return json.dumps(JSON_REPLY)
+        segments = MARKER.findall(prompt)
+        if segments:
+            # Translator batches: echo every marker with a "translated" segment
+            return "\n".join(f"<<<{n}>>>\n{segment.strip().upper()}" for n, segment in segments)
+        return " ".join(LOREM[i % len(LOREM)] for i in range(self.output_words))
+
+    def generate_content(self, prompt, generation_config=None, request_options=None, stream=False):
+        with self._lock:
+            self.calls += 1
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        time.sleep(self.latency)
+        if fail:
+            raise FakeUpstreamError(503, "Service unavailable (injected)")
+        reply = self._reply(prompt, generation_config)
+        usage = _Usage(prompt, reply)
+        with self._lock:
+            self.prompt_tokens += usage.prompt_token_count
+            self.output_tokens += usage.candidates_token_count
+        if not stream:
+            return FakeResponse(reply, usage)
+        words = reply.split(" ")
+        chunks = [" ".join(words[i:i + self.chunk_words]) + " " for i in range(0, len(words), self.chunk_words)]
+        return FakeStream(chunks, usage, self.chunk_delay)
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "errors": self.errors,
+                    "prompt_tokens": self.prompt_tokens, "output_tokens": self.output_tokens}
+
+
+def install_fake_gemini(model):
+    """Makes every utils.gemini_client call use `model` (wrapped like a real one)."""
+    from utils import gemini_client
+    gemini_client._models[gemini_client.MODEL_NAME] = gemini_client.GuardedModel(model)
+    return model
+
+
+# --- Fake Pexels ---
+VARIANTS = ("original", "large2x", "large", "medium", "small", "portrait", "landscape", "tiny")
+VARIANT_SIZES = {"tiny": (280, 200), "small": (130, 200), "medium": (350, 233), "original": (1200, 800)}
+
+
+def _jpeg(width, height, seed):
+    from PIL import Image
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), ((seed * 37) % 256, (seed * 91) % 256, 160)).save(out, "JPEG", quality=80)
+    return out.getvalue()
+
+
+class FakePexelsServer:
+    """
+    Serves /v1/search and /images/<id>/<variant>.jpg on 127.0.0.1 in a background thread.
+    Responses carry X-Ratelimit-* and Cache-Control headers like the real API; injected
+    errors are 429s with a Retry-After of 0 or 503s.
+    """
+
+    def __init__(self, latency=0.03, error_rate=0.0, total_results=500, seed=42):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.total_results = total_results
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._images = {}
+        self.searches = self.downloads = self.errors = 0
+        self.remaining = 20000
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so the app's pooled session is exercised
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server._handle(self)
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    @property
+    def search_url(self):
+        return f"{self.url}/v1/search"
+
+    def _photo(self, photo_id):
+        src = {variant: f"{self.url}/images/{photo_id}/{variant}.jpg" for variant in VARIANTS}
+        return {"id": photo_id, "width": 1200, "height": 800, "url": f"{self.url}/photo/{photo_id}",
+                "photographer": "Bench Mark", "photographer_url": f"{self.url}/@bench", "src": src}
+
+    def _send(self, handler, status, body, content_type, headers=None):
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _handle(self, handler):
+        with self._lock:
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        time.sleep(self.latency)
+        if fail:
+            status = self._random.choice((429, 503))
+            self._send(handler, status, b'{"error": "injected"}', "application/json", {"Retry-After": "0"})
+            return
+
+        parsed = urlparse(handler.path)
+        if parsed.path == "/v1/search":
+            query = parse_qs(parsed.query)
+            page = int(query.get("page", ["1"])[0])
+            per_page = int(query.get("per_page", ["15"])[0])
+            base = zlib.crc32(query.get("query", [""])[0].encode()) % 100000 * 1000
+            first = (page - 1) * per_page
+            photos = [self._photo(base + i) for i in range(first, min(first + per_page, self.total_results))]
+            with self._lock:
+                self.searches += 1
+                self.remaining -= 1
+                remaining = self.remaining
+            body = json.dumps({
+                "page": page, "per_page": per_page, "photos": photos, "total_results": self.total_results,
+                "next_page": f"{self.url}/v1/search?page={page + 1}" if first + per_page < self.total_results else None,
+            }).encode()
+            self._send(handler, 200, body, "application/json", {
+                "Cache-Control": "max-age=3600",
+                "X-Ratelimit-Limit": "20000",
+                "X-Ratelimit-Remaining": str(remaining),
+                "X-Ratelimit-Reset": str(int(time.time()) + 30 * 24 * 3600),
+            })
+        elif parsed.path.startswith("/images/"):
+            _, _, photo_id, name = parsed.path.split("/")
+            variant = name.rsplit(".", 1)[0]
+            key = (photo_id, variant)
+            if key not in self._images:
+                self._images[key] = _jpeg(*VARIANT_SIZES.get(variant, (940, 650)), int(photo_id))
+            with self._lock:
+                self.downloads += 1
+            self._send(handler, 200, self._images[key], "image/jpeg")
+        else:
+            self._send(handler, 404, b"not found", "text/plain")
+
+    def stats(self):
+        with self._lock:
+            return {"searches": self.searches, "downloads": self.downloads, "errors": self.errors}
+
+
+def install_fake_pexels(server):
+    """Points utils.pexels at the fake server."""
+    from utils import pexels
+    pexels.API_URL = server.search_url
+    pexels.PEXELS_KEY = "benchmark"
+    return server
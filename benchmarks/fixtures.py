@@ -0,0 +1,135 @@
+# benchmarks/fixtures.py
+"""
+Generated document corpus for the benchmarks: PDF, DOCX and PPTX files at several sizes.
+Files are built deterministically on first use and kept under .cache/benchmarks/fixtures,
+so nothing binary is committed and every machine benchmarks the same documents.
+"""
+import io
+import os
+import random
+
+from utils.response_cache import CACHE_DIR
+
+FIXTURE_DIR = os.getenv("BENCHMARK_FIXTURE_DIR", os.path.join(CACHE_DIR, "benchmarks", "fixtures"))
+
+# (kind, size name) -> number of pages, paragraphs or slides
+FIXTURE_SIZES = {
+    "pdf": {"small": 5, "medium": 50, "large": 300},
+    "docx": {"small": 50, "medium": 500, "large": 3000},
+    "pptx": {"small": 5, "medium": 30, "large": 150},
+}
+
+WORDS = (
+    "performance latency throughput cache request document summary translation paragraph slide "
+    "budget memory worker process thread stream token model answer question index chunk search "
+    "the a of and to in is for that with on as by this from"
+).split()
+
+
+class FixtureFile:
+    """Quacks like a Streamlit UploadedFile: `.name` and `.getvalue()`."""
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.size = os.path.getsize(path)
+
+    def getvalue(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+
+def _sentences(rng, count, words=(8, 20)):
+    out = []
+    for _ in range(count):
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(*words)))
+        out.append(sentence.capitalize() + ".")
+    return " ".join(out)
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_pdf(pages, seed=0):
+    """A minimal valid PDF with a few lines of Helvetica text per page (no PDF library needed)."""
+    rng = random.Random(seed)
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(pages))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>")
+    font_ref = 3 + 2 * pages
+    for i in range(pages):
+        lines = [f"Page {i + 1}"] + [_sentences(rng, 1, (6, 10)) for _ in range(30)]
+        text = " ".join(f"({_pdf_escape(line)}) Tj T*" for line in lines)
+        stream = f"BT /F1 10 Tf 14 TL 50 760 Td {text} ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R "
+            f"/Resources << /Font << /F1 {font_ref} 0 R >> >> >>"
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def build_docx(paragraphs, seed=0):
+    from docx import Document
+    rng = random.Random(seed)
+    doc = Document()
+    doc.add_heading("Benchmark document", level=1)
+    for i in range(paragraphs):
+        if i % 25 == 0:
+            doc.add_heading(f"Section {i // 25 + 1}", level=2)
+        doc.add_paragraph(_sentences(rng, rng.randint(2, 5)))
+    out = io.BytesIO()
+    doc.save(out)
+    return out.getvalue()
+
+
+def build_pptx(slides, seed=0):
+    from pptx import Presentation
+    rng = random.Random(seed)
+    pres = Presentation()
+    for i in range(slides):
+        slide = pres.slides.add_slide(pres.slide_layouts[1])
+        slide.shapes.title.text = f"Slide {i + 1}: {_sentences(rng, 1, (3, 6))}"
+        body = slide.placeholders[1].text_frame
+        body.text = _sentences(rng, 1)
+        for _ in range(4):
+            body.add_paragraph().text = _sentences(rng, 1)
+        slide.notes_slide.notes_text_frame.text = _sentences(rng, 2)
+    out = io.BytesIO()
+    pres.save(out)
+    return out.getvalue()
+
+
+BUILDERS = {"pdf": build_pdf, "docx": build_docx, "pptx": build_pptx}
+
+
+def get_fixture(kind, size, directory=FIXTURE_DIR):
+    """Returns a FixtureFile for e.g. ("pdf", "large"), generating it the first time."""
+    count = FIXTURE_SIZES[kind][size]
+    path = os.path.join(directory, f"{size}_{count}.{kind}")
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        data = BUILDERS[kind](count, seed=count)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    return FixtureFile(path)
+
+
+def iter_fixtures(kinds=tuple(FIXTURE_SIZES), sizes=("small", "medium", "large")):
+    for kind in kinds:
+        for size in sizes:
+            yield kind, size, get_fixture(kind, size)
@@ -0,0 +1,427 @@
+# benchmarks/load.py
+"""
+Multi-session load test: scripted users driving Welcome.py and every page headlessly.
+
+Each simulated user opens the pages as Streamlit AppTest sessions and clicks through a
+scripted scenario on each (generate a blog suite, browse the gallery, upload a document and
+ask ten questions, translate text and documents...) against the local fakes in
+benchmarks/fakes.py. Every user visits all selected scenarios, starting at a different one,
+so concurrent users are spread over the pages. All sessions share one process, like they
+share one Streamlit server, and arrive evenly over the ramp period. Every concurrency level
+runs in a fresh process and reports:
+
+  - rerun latency: from the rerun request to the finished script run
+  - queueing delay: from the rerun request to the moment the script actually starts running
+  - job time: for clicks that start a background job (blog suite, summary, document and
+    multi-language translation), from the click until the result is on the page
+  - memory per session: RSS growth over the idle, warmed-up process divided by the sessions
+
+    python -m benchmarks.load                        # 1, 2, 4 and 8 concurrent sessions, every scenario
+    python -m benchmarks.load -s 1,10,25 --ramp 5    # ramp to 25 sessions over five seconds
+    python -m benchmarks.load doc_qa translator      # only some scenarios
+    python -m benchmarks.load --json load.json       # also write the raw results
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.run import DEFAULT_SETTINGS as WORKLOAD_SETTINGS, ROOT, benchmark_env, percentile
+
+DEFAULT_SETTINGS = {
+    "sessions": [1, 2, 4, 8],
+    "ramp_s": 2.0,
+    "think_ms": 200,
+    "gemini_latency_ms": WORKLOAD_SETTINGS["gemini_latency_ms"],
+    "pexels_latency_ms": WORKLOAD_SETTINGS["pexels_latency_ms"],
+    "error_rate": 0.0,
+}
+RUN_TIMEOUT = 120       # seconds a single rerun may take before the session counts it as failed
+MEMORY_SAMPLE_S = 0.05
+JOB_POLL_SECONDS = 0.1  # how often a session with a running job reruns to collect it
+JOB_KEYS = ("blog_job", "summary_job", "document_job", "multi_job")  # session-state keys holding job ids
+
+MIME_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+}
+
+
+# --- Sessions ---
+_current = threading.local()  # timing of the rerun the calling thread is waiting on
+
+
+class Session:
+    """One simulated user: an AppTest for `script` whose reruns are timed."""
+
+    def __init__(self, script, name, think_s, records):
+        from streamlit.testing.v1 import AppTest
+        self.app = AppTest.from_file(os.path.join(ROOT, script), default_timeout=RUN_TIMEOUT)
+        self.name = name
+        self.think_s = think_s
+        self.records = records
+
+    def step(self, action=None):
+        """
+        Thinks, applies `action` to the last rendered page, then reruns the script and records it.
+        If the rerun left a background job running, keeps polling until its result is on the page
+        and records that wait as the step's job_ms.
+        """
+        time.sleep(self.think_s)
+        if action:
+            action(self.app)
+        submitted = time.perf_counter()
+        record = clicked = self._rerun()
+        if self._active_job():
+            while self._active_job() and not record["error"]:
+                if time.perf_counter() - submitted > RUN_TIMEOUT:
+                    record["error"] = f"job still running after {RUN_TIMEOUT}s"
+                    break
+                time.sleep(JOB_POLL_SECONDS)
+                # A full rerun: in a browser only the page's polling fragment reruns
+                record = self._rerun()
+            clicked["job_ms"] = (time.perf_counter() - submitted) * 1000
+        return self.app
+
+    def _rerun(self):
+        error = None
+        timing = _current.timing = {}
+        try:
+            self.app.run()
+            if self.app.exception:
+                error = self.app.exception[0].value
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finished = time.perf_counter()
+        requested = timing.get("requested", finished)
+        record = {
+            "scenario": self.name,
+            "latency_ms": (finished - requested) * 1000,
+            "queue_ms": (timing.get("started", finished) - requested) * 1000,
+            "error": error,
+        }
+        self.records.append(record)
+        return record
+
+    def _active_job(self):
+        """True while a job id the page keeps in session state is still queued or running."""
+        from utils.jobs import get_job, is_active
+        state = self.app.session_state
+        return any(key in state and is_active(get_job(state[key])) for key in JOB_KEYS)
+
+    def button(self, label):
+        return next(button for button in self.app.button if button.label == label)
+
+    def upload(self, uploader, kind, size):
+        from benchmarks.fixtures import get_fixture
+        fixture = get_fixture(kind, size)
+        uploader.upload(fixture.name, fixture.getvalue(), MIME_TYPES[kind])
+
+
+# --- Scenarios (each takes a Session and the user number) ---
+def _welcome(session, user):
+    session.step()
+    session.step()
+
+
+def _blog(session, user):
+    session.step()
+    session.step(lambda app: (app.text_input(key="topic").set_value(f"Load testing topic {user}"),
+                              app.text_area(key="keywords").set_value("latency, capacity, caching")))
+    session.step(lambda app: session.button("Generate Content Suite").click())
+    # Then the long-form version of the same post
+    session.step(lambda app: app.toggle(key="long_form").set_value(True))
+    session.step(lambda app: session.button("Generate Content Suite").click())
+
+
+def _image(session, user):
+    session.step()
+    session.step(lambda app: app.text_input[0].set_value(f"load test keyword {user}"))
+    session.step(lambda app: session.button("Find Photo").click())
+    session.step(lambda app: app.toggle[0].set_value(True))
+    session.step(lambda app: session.button("Find Photos").click())
+    session.step(lambda app: next(b for b in app.button if b.label == "Select").click())
+    session.step(lambda app: session.button("Next page ▶").click())
+
+
+def _doc_qa(session, user):
+    session.step()
+    session.step(lambda app: session.upload(app.file_uploader(key="qa_uploader"), "pdf", "medium"))
+    for question in range(10):
+        session.step(lambda app: app.chat_input[0].set_value(
+            f"User {user}: what does the document say about cache {question}?"))
+
+
+def _summarize(session, user):
+    session.step()
+    session.step(lambda app: session.upload(app.file_uploader(key="summary_uploader"), "docx", "small"))
+    session.step(lambda app: session.button("✨ Generate Summary").click())
+
+
+def _translator(session, user):
+    session.step()
+    text = f"The report for user {user} is ready. Latency fell by a third. We ship on Friday."
+    session.step(lambda app: app.text_area(key="source_text_area").set_value(text))
+    session.step(lambda app: session.button("Translate").click())
+    session.step(lambda app: session.button("⇄").click())
+    session.step(lambda app: app.toggle[0].set_value(True))
+    session.step(lambda app: session.button("Translate into 3 languages").click())
+
+
+def _doc_translate(session, user):
+    session.step()
+    session.step(lambda app: app.radio[0].set_value("📄 Document"))
+    session.step(lambda app: session.upload(app.file_uploader[0], "pptx", "small"))
+    session.step(lambda app: session.button("Translate Document").click())
+
+
+SCENARIOS = {  # name -> (script, scenario)
+    "welcome": ("Welcome.py", _welcome),
+    "blog": ("pages/Blog_generator.py", _blog),
+    "image": ("pages/Image_generator.py", _image),
+    "doc_qa": ("pages/pdf_summarizer.py", _doc_qa),
+    "summarize": ("pages/pdf_summarizer.py", _summarize),
+    "translator": ("pages/Translator.py", _translator),
+    "doc_translate": ("pages/Translator.py", _doc_translate),
+}
+
+
+# --- AppTest in one process with many sessions ---
+def _prepare_streamlit():
+    """
+    AppTest is written for one session at a time: every run installs a mock Runtime and
+    clears it when done, so with concurrent sessions one session's cleanup would pull the
+    runtime out from under another, and every run compiles the script again (concurrent
+    compiles can crash CPython 3.11's parser). Sessions here share the first mock Runtime
+    and one script cache, like sessions on a real server do. Each rerun also notes when it was requested (once the
+    test harness has set up its runner) and when its script thread started.
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner import ScriptRunnerEvent
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+    shared = {}
+    script_cache = ScriptCache()
+    init = LocalScriptRunner.__init__
+
+    def __init__(self, *args, **kwargs):
+        init(self, *args, **kwargs)
+        self._script_cache = script_cache
+        if Runtime._instance is not None:
+            shared.setdefault("runtime", Runtime._instance)
+        timing = getattr(_current, "timing", None)
+        if timing is None:
+            return
+        timing["requested"] = time.perf_counter()
+
+        def on_event(sender, event, **data):
+            if event == ScriptRunnerEvent.SCRIPT_STARTED:
+                timing.setdefault("started", time.perf_counter())
+
+        self.on_event.connect(on_event, weak=False)
+
+    LocalScriptRunner.__init__ = __init__
+    Runtime.instance = classmethod(lambda cls: cls._instance if cls._instance is not None else shared["runtime"])
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or "runtime" in shared)
+
+
+def _rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:  # not Linux: fall back to the peak so far
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class MemorySampler:
+    """Samples this process's RSS in the background and keeps the peak."""
+
+    def __init__(self):
+        self.peak = _rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(MEMORY_SAMPLE_S):
+            self.peak = max(self.peak, _rss_mb())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_mb())
+
+
+# --- Statistics ---
+def summarize(records):
+    latencies = [record["latency_ms"] for record in records]
+    queues = [record["queue_ms"] for record in records]
+    errors = [record["error"] for record in records if record["error"]]
+    jobs = [record["job_ms"] for record in records if "job_ms" in record]
+    return {
+        "reruns": len(records),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "queue_p50_ms": round(percentile(queues, 50), 2),
+        "queue_p95_ms": round(percentile(queues, 95), 2),
+        "jobs": len(jobs),
+        "job_p50_ms": round(percentile(jobs, 50), 1) if jobs else None,
+        "job_p95_ms": round(percentile(jobs, 95), 1) if jobs else None,
+    }
+
+
+# --- Child Process: one concurrency level ---
+def _child(sessions, scenarios, settings):
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    from benchmarks.fakes import FakeGeminiModel, FakePexelsServer, install_fake_gemini, install_fake_pexels
+    from benchmarks.fixtures import iter_fixtures
+
+    _prepare_streamlit()
+    gemini = install_fake_gemini(FakeGeminiModel(
+        latency=settings["gemini_latency_ms"] / 1000, error_rate=settings["error_rate"]
+    ))
+    with FakePexelsServer(latency=settings["pexels_latency_ms"] / 1000, error_rate=settings["error_rate"]) as pexels:
+        install_fake_pexels(pexels)
+        for _ in iter_fixtures(sizes=("small", "medium")):
+            pass
+        # Render every script once, so imports and module-level state are not billed to the sessions
+        for script in sorted({SCENARIOS[name][0] for name in scenarios}):
+            Session(script, "warmup", 0, []).step()
+        baseline_mb = _rss_mb()
+
+        records = []
+        threads = []
+
+        def user(number):
+            offset = number % len(scenarios)
+            for name in scenarios[offset:] + scenarios[:offset]:
+                script, scenario = SCENARIOS[name]
+                session = Session(script, name, settings["think_ms"] / 1000, records)
+                try:
+                    scenario(session, number)
+                except Exception as e:  # a widget the script never rendered, usually after a failed rerun
+                    records.append({"scenario": name, "latency_ms": 0.0, "queue_ms": 0.0,
+                                    "error": f"{type(e).__name__}: {e}"})
+
+        start = time.perf_counter()
+        with MemorySampler() as memory:
+            for number in range(sessions):
+                # Evenly spread the arrivals over the ramp period
+                delay = start + settings["ramp_s"] * number / sessions - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                thread = threading.Thread(target=user, args=(number,), daemon=True)
+                thread.start()
+                threads.append(thread)
+            for thread in threads:
+                thread.join()
+        wall = time.perf_counter() - start
+        upstream = {"gemini": gemini.stats(), "pexels": pexels.stats()}
+
+    result = summarize(records)
+    result.update({
+        "sessions": sessions,
+        "wall_s": round(wall, 2),
+        "reruns_per_s": round(len(records) / wall, 2),
+        "baseline_rss_mb": round(baseline_mb, 1),
+        "peak_rss_mb": round(memory.peak, 1),
+        "mb_per_session": round((memory.peak - baseline_mb) / sessions, 2),
+        "scenarios": {name: summarize([r for r in records if r["scenario"] == name])
+                      for name in scenarios if any(r["scenario"] == name for r in records)},
+        "upstream": upstream,
+    })
+    print(json.dumps(result))
+
+
+def run_level(sessions, scenarios, settings):
+    with tempfile.TemporaryDirectory(prefix="load-cache-") as cache_dir:
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.load", "--child", str(sessions),
+             "--settings", json.dumps(settings), *scenarios],
+            cwd=ROOT, env=benchmark_env(cache_dir), capture_output=True, text=True,
+        )
+    if proc.returncode != 0 or not proc.stdout.strip():
+        raise RuntimeError(f"{sessions} sessions failed:\n{proc.stderr[-3000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def report(results):
+    print(f"\n{'sessions':>8} {'reruns':>6} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'queue p95':>9} {'reruns/s':>8} {'RSS MB':>7} {'MB/session':>10}")
+    for r in results:
+        print(f"{r['sessions']:8} {r['reruns']:6} {r['errors']:4} {r['p50_ms']:8.0f} {r['p95_ms']:8.0f} "
+              f"{r['p99_ms']:8.0f} {r['queue_p95_ms']:9.1f} {r['reruns_per_s']:8.1f} {r['peak_rss_mb']:7.1f} "
+              f"{r['mb_per_session']:10.2f}")
+    last = results[-1]
+    print(f"\nBy scenario at {last['sessions']} sessions:")
+    for name, r in last["scenarios"].items():
+        print(f"  {name:14} {r['reruns']:5} reruns {r['errors']:3} err  p50 {r['p50_ms']:7.0f} ms  "
+              f"p95 {r['p95_ms']:7.0f} ms  queue p95 {r['queue_p95_ms']:6.1f} ms"
+              + (f"  job p95 {r['job_p95_ms']:7.0f} ms" if r["jobs"] else ""))
+    for r in results:
+        if r["first_error"]:
+            print(f"\nFirst error at {r['sessions']} sessions: {r['first_error']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scenarios", nargs="*", help=f"scenarios to run (default: all): {', '.join(SCENARIOS)}")
+    parser.add_argument("-s", "--sessions", default=",".join(map(str, DEFAULT_SETTINGS["sessions"])),
+                        help="comma-separated concurrency levels, e.g. 1,5,10")
+    parser.add_argument("--ramp", type=float, default=DEFAULT_SETTINGS["ramp_s"],
+                        help="seconds over which each level's sessions arrive")
+    parser.add_argument("--think-ms", type=float, default=DEFAULT_SETTINGS["think_ms"],
+                        help="pause before every interaction")
+    parser.add_argument("--gemini-latency-ms", type=float, default=DEFAULT_SETTINGS["gemini_latency_ms"])
+    parser.add_argument("--pexels-latency-ms", type=float, default=DEFAULT_SETTINGS["pexels_latency_ms"])
+    parser.add_argument("--error-rate", type=float, default=DEFAULT_SETTINGS["error_rate"])
+    parser.add_argument("--json", help="write the raw results to this file")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--settings", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    scenarios = args.scenarios or list(SCENARIOS)
+    if args.child:
+        _child(args.child, scenarios, json.loads(args.settings))
+        return 0
+
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    levels = [int(level) for level in args.sessions.split(",") if level.strip()]
+    settings = {
+        "sessions": levels,
+        "ramp_s": args.ramp,
+        "think_ms": args.think_ms,
+        "gemini_latency_ms": args.gemini_latency_ms,
+        "pexels_latency_ms": args.pexels_latency_ms,
+        "error_rate": args.error_rate,
+    }
+
+    results = []
+    for level in levels:
+        print(f"Running {level} concurrent session{'s' if level != 1 else ''}...", flush=True)
+        results.append(run_level(level, scenarios, settings))
+    report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "results": results}, f, indent=2)
+    return 1 if any(r["errors"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
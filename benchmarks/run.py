@@ -0,0 +1,282 @@
+# benchmarks/run.py
+"""
+Offline throughput and latency benchmarks for the app's core helpers.
+
+Every workload runs in its own fresh process against the local fakes in benchmarks/fakes.py
+(no keys, no network) with a throwaway cache directory, and reports p50/p95/p99 latency,
+throughput, error count and peak RSS. Results are compared with benchmarks/baseline.json.
+
+    python -m benchmarks.run                         # all workloads, compared with the baseline
+    python -m benchmarks.run translate qa -n 100     # some workloads, 100 operations each
+    python -m benchmarks.run --error-rate 0.05       # inject 5% upstream errors
+    python -m benchmarks.run --update-baseline       # store these results as the new baseline
+    python -m benchmarks.run --fail-on-regression    # exit 1 if anything regressed past --threshold
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+DEFAULT_SETTINGS = {
+    "iterations": 50,
+    "concurrency": 4,
+    "gemini_latency_ms": 50,
+    "pexels_latency_ms": 30,
+    "error_rate": 0.0,
+}
+REGRESSION_THRESHOLD = 0.2  # 20% worse latency, throughput or memory counts as a regression
+
+
+# --- Workloads (each returns an operation taking the iteration number) ---
+def _blog(settings):
+    from utils.blog import generate_blog_content
+    return lambda i: generate_blog_content(f"Benchmark topic {i}", "speed, caching", 600, "Informative",
+                                           "Developers", "Try it today")
+
+
+def _blog_stream(settings):
+    from utils.blog import stream_blog_content
+    return lambda i: "".join(stream_blog_content(f"Streamed topic {i}", "speed", 600, "Informative",
+                                                 "Developers", "Try it today"))
+
+
+def _extract(kind, size):
+    def setup(settings):
+        from benchmarks.fixtures import get_fixture
+        from utils.extraction import extract_text_from_file
+        fixture = get_fixture(kind, size)
+        return lambda i: extract_text_from_file(fixture)
+    return setup
+
+
+def _qa(settings):
+    from benchmarks.fixtures import get_fixture
+    from utils.chat_history import ChatHistoryManager
+    from utils.doc_qa import get_answer_from_gemini
+    from utils.doc_store import load_document, load_document_index
+    index = load_document_index(load_document(get_fixture("pdf", "medium")))
+    return lambda i: get_answer_from_gemini(index, ChatHistoryManager(), [], f"What does the document say about cache {i}?")
+
+
+def _translate(settings):
+    from utils.translation import translate_text_with_gemini
+    sentences = ["The report is ready.", "Latency fell by a third.", "Please review section {i}.",
+                 "The cache now serves most requests.", "We ship on Friday."]
+    # Every operation has one new sentence, so the translation memory hits the other four
+    return lambda i: translate_text_with_gemini(" ".join(s.format(i=i) for s in sentences), "English", "Spanish")
+
+
+def _pexels(settings):
+    from utils.pexels import get_image_from_pexels_api
+    return lambda i: get_image_from_pexels_api(f"benchmark keyword {i}", "landscape", "large")
+
+
+WORKLOADS = {
+    "blog": _blog,
+    "blog_stream": _blog_stream,
+    "qa": _qa,
+    "translate": _translate,
+    "pexels": _pexels,
+}
+for _kind in ("pdf", "docx", "pptx"):
+    for _size in ("small", "medium", "large"):
+        WORKLOADS[f"extract_{_kind}_{_size}"] = _extract(_kind, _size)
+
+# Large documents are slow on purpose; fewer operations keep the whole suite a few minutes long
+ITERATION_SCALE = {name: 0.2 for name in WORKLOADS if name.endswith("_large")}
+
+
+# --- Statistics ---
+def percentile(values, q):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(latencies, wall_seconds, errors, peak_rss_kb, upstream):
+    ms = [latency * 1000 for latency in latencies]
+    return {
+        "operations": len(ms),
+        "errors": errors,
+        "p50_ms": round(percentile(ms, 50), 2),
+        "p95_ms": round(percentile(ms, 95), 2),
+        "p99_ms": round(percentile(ms, 99), 2),
+        "throughput_per_s": round(len(ms) / wall_seconds, 2),
+        "peak_rss_mb": round(peak_rss_kb / 1024, 1),
+        "upstream": upstream,
+    }
+
+
+# --- Child Process: one workload ---
+def _child(name, settings):
+    sys.path.insert(0, ROOT)
+    from benchmarks.fakes import FakeGeminiModel, FakePexelsServer, install_fake_gemini, install_fake_pexels
+
+    gemini = install_fake_gemini(FakeGeminiModel(
+        latency=settings["gemini_latency_ms"] / 1000, error_rate=settings["error_rate"]
+    ))
+    with FakePexelsServer(latency=settings["pexels_latency_ms"] / 1000, error_rate=settings["error_rate"]) as pexels:
+        install_fake_pexels(pexels)
+        operation = WORKLOADS[name](settings)
+        iterations = max(3, int(settings["iterations"] * ITERATION_SCALE.get(name, 1)))
+
+        def timed(i):
+            start = time.perf_counter()
+            result = operation(i)
+            failed = isinstance(result, str) and result.lstrip().lower().startswith(("error", "an error"))
+            return time.perf_counter() - start, failed
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=settings["concurrency"]) as executor:
+            outcomes = list(executor.map(timed, range(iterations)))
+        wall = time.perf_counter() - start
+        upstream = {"gemini": gemini.stats(), "pexels": pexels.stats()}
+
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # kilobytes on Linux
+    print(json.dumps(summarize([latency for latency, _ in outcomes], wall,
+                               sum(failed for _, failed in outcomes), peak_rss_kb, upstream)))
+
+
+def benchmark_env(cache_dir):
+    """Environment for a benchmark child process: placeholder keys and a throwaway cache."""
+    from benchmarks.fixtures import FIXTURE_DIR
+    return dict(
+        os.environ,
+        APP_CACHE_DIR=cache_dir,
+        BENCHMARK_FIXTURE_DIR=os.path.abspath(FIXTURE_DIR),  # fixtures outlive the per-run cache
+        GEMINI_API_KEY="benchmark",
+        PEXELS_API_KEY="benchmark",
+        # The app's own rate limits would otherwise dominate; the fakes have no quota
+        GEMINI_REQUESTS_PER_MINUTE="1000000",
+        GEMINI_BURST="1000",
+        PEXELS_REQUESTS_PER_HOUR="100000000",
+        PEXELS_BURST="1000",
+    )
+
+
+def run_workload(name, settings):
+    with tempfile.TemporaryDirectory(prefix="bench-cache-") as cache_dir:
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.run", "--child", name, "--settings", json.dumps(settings)],
+            cwd=ROOT, env=benchmark_env(cache_dir), capture_output=True, text=True,
+        )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Workload {name} failed:\n{proc.stderr[-3000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+# --- Baseline Comparison ---
+METRICS = (  # name, True when higher is better
+    ("p50_ms", False),
+    ("p95_ms", False),
+    ("p99_ms", False),
+    ("throughput_per_s", True),
+    ("peak_rss_mb", False),
+)
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Returns (rows, regressions): per-metric changes against the baseline, and the ones past the threshold."""
+    rows, regressions = [], []
+    for name, result in results.items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            continue
+        for metric, higher_is_better in METRICS:
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            rows.append((name, metric, old, new, change))
+            if worse > threshold:
+                regressions.append(f"{name} {metric}: {old} -> {new} ({change:+.0%})")
+    return rows, regressions
+
+
+def report(results, rows):
+    print(f"\n{'workload':24} {'ops':>5} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>8} {'RSS MB':>7}")
+    for name, r in results.items():
+        print(f"{name:24} {r['operations']:5} {r['errors']:4} {r['p50_ms']:9.1f} {r['p95_ms']:9.1f} "
+              f"{r['p99_ms']:9.1f} {r['throughput_per_s']:8.1f} {r['peak_rss_mb']:7.1f}")
+    if rows:
+        print("\nChange against baseline:")
+        for name, metric, old, new, change in rows:
+            print(f"  {name:24} {metric:17} {old:>10} -> {new:<10} {change:+.0%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("workloads", nargs="*", help=f"workloads to run (default: all): {', '.join(WORKLOADS)}")
+    parser.add_argument("-n", "--iterations", type=int, default=DEFAULT_SETTINGS["iterations"])
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_SETTINGS["concurrency"])
+    parser.add_argument("--gemini-latency-ms", type=float, default=DEFAULT_SETTINGS["gemini_latency_ms"])
+    parser.add_argument("--pexels-latency-ms", type=float, default=DEFAULT_SETTINGS["pexels_latency_ms"])
+    parser.add_argument("--error-rate", type=float, default=DEFAULT_SETTINGS["error_rate"])
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--json", help="write the raw results to this file")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--settings", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(args.child, json.loads(args.settings))
+        return 0
+
+    unknown = [name for name in args.workloads if name not in WORKLOADS]
+    if unknown:
+        parser.error(f"unknown workloads: {', '.join(unknown)}")
+    settings = {key: getattr(args, key) for key in DEFAULT_SETTINGS}
+    selected = args.workloads or list(WORKLOADS)
+    if any(name.startswith("extract_") or name == "qa" for name in selected):
+        # Build the corpus up front so generating it never counts towards a workload
+        from benchmarks.fixtures import iter_fixtures
+        print("Preparing document fixtures...", flush=True)
+        for _ in iter_fixtures():
+            pass
+
+    results = {}
+    for name in selected:
+        print(f"Running {name}...", flush=True)
+        results[name] = run_workload(name, settings)
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            baseline = json.load(f)
+    if baseline and baseline.get("settings") != settings:
+        print("Note: the baseline was recorded with different settings; the comparison is indicative only.")
+    rows, regressions = compare(results, baseline, args.threshold)
+    report(results, rows)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "results": results}, f, indent=2)
+    if args.update_baseline:
+        merged = {**baseline.get("results", {}), **results} if baseline.get("settings") == settings else results
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "results": merged}, f, indent=2)
+            f.write("\n")
+        print(f"\nUpdated {os.path.relpath(BASELINE_PATH, ROOT)}")
+    if regressions:
+        print(f"\nRegressions beyond {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        if args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+# benchmarks/startup.py
+"""
+Cold-start benchmark for Welcome.py and the pages.
+
+Each script is rendered once in a fresh interpreter (so nothing is already imported) with
+Streamlit's AppTest, under `python -X importtime`. For every script it records the
+time-to-first-render, the slowest imports that render triggered, and whether any module
+that should stay lazy was imported. The results are checked against startup_budget.json.
+
+    python -m benchmarks.startup                  # measure and check the budget (exit 1 on failure)
+    python -m benchmarks.startup --update-budget  # re-baseline the render budgets (with headroom)
+    python -m benchmarks.startup --json out.json  # also write the raw results
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_budget.json")
+SCRIPTS = [
+    "Welcome.py",
+    "pages/Blog_generator.py",
+    "pages/Image_generator.py",
+    "pages/pdf_summarizer.py",
+    "pages/Translator.py",
+]
+RUNS = 3                  # fresh processes per script; the median is reported
+BUDGET_HEADROOM = 1.5     # --update-budget sets each render budget to measured * headroom
+TOP_IMPORTS = 8
+PHASE_MARKER = "--- startup benchmark: first render ---"
+
+
+# --- Child Process: render one script ---
+def _child(script):
+    # Placeholder keys so pages render their normal UI; the first render makes no requests
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    os.environ.setdefault("PEXELS_API_KEY", "benchmark")
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+
+    # Streamlit and the test harness are the framework's cost, not ours: load them first
+    from streamlit.testing.v1 import AppTest
+    baseline = set(sys.modules)
+    print(PHASE_MARKER, file=sys.stderr, flush=True)
+
+    start = time.perf_counter()
+    app = AppTest.from_file(os.path.join(ROOT, script), default_timeout=60).run()
+    render_ms = (time.perf_counter() - start) * 1000
+    print(json.dumps({
+        "render_ms": render_ms,
+        "exceptions": [str(e.value) for e in app.exception],
+        "imported": sorted(set(sys.modules) - baseline),
+    }))
+
+
+def _parse_importtime(stderr):
+    """Returns [(cumulative_ms, module)] for top-level imports after the phase marker."""
+    _, _, after = stderr.partition(PHASE_MARKER)
+    imports = []
+    for line in after.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit() and not name.startswith("  "):  # nested imports are indented
+            imports.append((int(cumulative) / 1000, name.strip()))
+    return imports
+
+
+def measure(script):
+    """Renders `script` RUNS times in fresh interpreters and returns the median run."""
+    runs = []
+    for _ in range(RUNS):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-m", "benchmarks.startup", "--child", script],
+            cwd=ROOT, capture_output=True, text=True,
+        )
+        if proc.returncode != 0 or not proc.stdout.strip():
+            raise RuntimeError(f"{script} failed to render:\n{proc.stderr[-2000:]}")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        result["imports"] = sorted(_parse_importtime(proc.stderr), reverse=True)[:TOP_IMPORTS]
+        runs.append(result)
+    runs.sort(key=lambda run: run["render_ms"])
+    return runs[len(runs) // 2]
+
+
+# --- Budget ---
+def load_budget(path=BUDGET_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def check(results, budget):
+    """Returns a list of human-readable budget violations."""
+    failures = []
+    lazy = budget.get("lazy_modules", {})
+    for script, result in results.items():
+        limit = budget["render_ms"].get(script)
+        if limit is not None and result["render_ms"] > limit:
+            failures.append(f"{script}: first render took {result['render_ms']:.0f} ms, budget is {limit:.0f} ms")
+        if result["exceptions"]:
+            failures.append(f"{script}: raised {result['exceptions']}")
+        for module in lazy.get(script, lazy.get("*", [])):
+            if module in result["imported"]:
+                failures.append(f"{script}: imported {module} before it was needed")
+    return failures
+
+
+def report(results):
+    for script, result in results.items():
+        print(f"\n{script}: first render {result['render_ms']:.0f} ms")
+        for cumulative_ms, module in result["imports"]:
+            print(f"    {cumulative_ms:8.1f} ms  {module}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--update-budget", action="store_true", help="re-baseline the render budgets")
+    parser.add_argument("--json", help="write the raw results to this file")
+    parser.add_argument("scripts", nargs="*", default=SCRIPTS, help="scripts to measure (default: all)")
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(args.child)
+        return 0
+
+    results = {script: measure(script) for script in args.scripts}
+    report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    budget = load_budget()
+    if args.update_budget:
+        for script, result in results.items():
+            budget["render_ms"][script] = round(result["render_ms"] * BUDGET_HEADROOM, -1)
+        with open(BUDGET_PATH, "w", encoding="utf-8") as f:
+            json.dump(budget, f, indent=2)
+            f.write("\n")
+        print(f"\nUpdated {os.path.relpath(BUDGET_PATH, ROOT)}")
+        return 0
+
+    failures = check(results, budget)
+    if failures:
+        print("\nStartup budget exceeded:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+    print("\nAll scripts are within the startup budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
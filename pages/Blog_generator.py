@@ -1,88 +1,54 @@
 # pages/1_✍️_Blog_Generator.py
 import streamlit as st
-import google.generativeai as genai
-import os
-from dotenv import load_dotenv
+from utils.gemini_client import is_configured
+from utils.response_cache import format_cache_stats
+from utils.metrics import METRICS_PANEL, metrics_rows, set_page
+from utils.blog import run_blog_suite
+from utils.jobs import JOB_POLL_SECONDS, cancel_job, get_job, is_active, submit_job
 
 # --- Core Functionality ---
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-
-try:
-    genai.configure(api_key=GEMINI_API_KEY)
-    GEMINI_CONFIGURED = True
-except Exception as e:
-    GEMINI_CONFIGURED = False
-    print(f"Error configuring Gemini: {e}")
-
-# --- AI Generation Functions ---
-
-def generate_blog_content(topic, keywords, length, tone, audience, cta):
-    """Generates the main blog post content."""
-    prompt = f"""
-        You are a world-class blog writer, content strategist, and SEO expert. Your task is to write a comprehensive, engaging, and well-structured blog post.
-
-        **Primary Topic:** "{topic}"
-        **Keywords to strategically integrate:** "{keywords}"
-        **Target Audience:** "{audience}"
-        **Tone of Voice:** "{tone}"
-        **Target Length:** Approximately {length} words.
-        **Call to Action:** Conclude the blog post by naturally incorporating this call to action: "{cta}"
-
-        **Strict Structure Requirements:**
-        - **Main Title (H1):** Start with one, and only one, H1 title (using a single # in markdown). The title must be catchy, SEO-friendly, and directly related to the topic.
-        - **Introduction:** A short, compelling introduction that hooks the reader and states the blog's purpose.
-        - **Body Content:** Use multiple H2 headings (##) to divide the main sections. Use H3 subheadings (###) where necessary for more detailed points. Use lists, bold text, and italics to improve readability.
-        - **Conclusion:** Provide a concise summary of the key points and seamlessly integrate the call to action.
-
-        **Output Format:** Return ONLY the raw markdown text for the blog post. Do not include any of your own commentary before or after the markdown content.
-    """
-    try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        return f"Error from Gemini API: {str(e)}"
-
-def generate_accompanying_content(blog_post_content, topic, keywords):
-    """Generates SEO analysis, social posts, and an image prompt based on the blog."""
-    prompt = f"""
-        You are a multi-disciplinary AI assistant specializing in content marketing. Based on the following blog post, generate the requested accompanying assets.
-
-        **Blog Post Content:**
-        ---
-        {blog_post_content}
-        ---
-
-        **Main Topic:** "{topic}"
-        **Keywords:** "{keywords}"
-
-        **Tasks to Perform:**
-
-        1.  **SEO Analysis:**
-            -   **Meta Description:** Write a compelling, SEO-optimized meta description (155-160 characters).
-            -   **Keyword Analysis:** Briefly analyze how well the main keywords were integrated.
-            -   **Title Suggestion:** Offer one alternative, catchy title for A/B testing.
-
-        2.  **Social Media Posts:**
-            -   **Twitter/X Post:** A short, punchy tweet with relevant hashtags.
-            -   **LinkedIn Post:** A more professional post, suitable for a business audience, encouraging discussion.
-            -   **Facebook Post:** An engaging post that asks a question to drive comments.
-
-        3.  **Image Prompt:**
-            -   **Featured Image Idea:** Write a descriptive prompt for an AI image generator (like Midjourney or DALL-E) to create a high-quality featured image for this blog. Be specific about style, composition, colors, and mood.
-
-        **Output Format:** Return the response as a single block of markdown, using H2 (##) for each main section (SEO Analysis, Social Media Posts, Image Prompt) and H3 (###) for sub-sections.
-    """
-    try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        return f"Error from Gemini API: {str(e)}"
+# Configured once per process by the shared client; False when the key is missing
+GEMINI_CONFIGURED = is_configured()
+
+# --- Accompanying Content Renderers ---
+def render_seo(result):
+    st.markdown("### Meta Description")
+    st.code(result["meta_description"], language=None)
+    st.caption(f"{len(result['meta_description'])} characters")
+    st.markdown("### Keyword Analysis")
+    st.markdown(result["keyword_analysis"])
+    st.markdown("### Title Suggestion")
+    st.markdown(f"**{result['title_suggestion']}**")
+
+def render_social(result):
+    for label, key in (("Twitter/X Post", "twitter"), ("LinkedIn Post", "linkedin"), ("Facebook Post", "facebook")):
+        st.markdown(f"### {label}")
+        st.code(result[key], language=None) # st.code gives each post a copy button
+
+def render_image_prompt(result):
+    st.markdown(f"**Featured Image Idea:** {result['idea']}")
+    st.code(result["prompt"], language=None)
+
+ASSET_TABS = {
+    "seo": (render_seo, "SEO analysis", "SEO analysis will appear here."),
+    "social": (render_social, "social media posts", "Social media posts will appear here."),
+    "image": (render_image_prompt, "an image prompt", "The image prompt idea will appear here."),
+}
+
+def render_asset(area, name, result):
+    """Fills one tab's placeholder with its result, its error, or a waiting note."""
+    render, label, placeholder = ASSET_TABS[name]
+    with area.container():
+        if result is None:
+            st.info(placeholder)
+        elif isinstance(result, str):
+            st.error(f"Could not generate {label}: {result}")
+        else:
+            render(result)
 
 # --- Custom UI Styling (CSS) ---
 st.set_page_config(page_title="Blog Generator Pro", page_icon="✍️", layout="wide")
+set_page("Blog Generator")
 st.markdown("""<style>... </style>""", unsafe_allow_html=True) # Your full CSS block goes here
 
 # --- Streamlit Page Layout ---
@@ -98,8 +64,17 @@ with st.sidebar:
         tone_of_voice = st.selectbox("Tone of Voice",("Professional", "Casual", "Humorous", "Authoritative", "Inspirational"),key="tone")
         target_audience = st.text_input("Target Audience", placeholder="e.g., Tech Entrepreneurs", key="audience")
         call_to_action = st.text_input("Call to Action", placeholder="e.g., Subscribe to our newsletter!", key="cta")
+        long_form = st.toggle(
+            "Long-form mode", value=False, key="long_form",
+            help="Plans an outline first, then writes every section in parallel. Much faster for long posts."
+        )
+    stream_output = st.toggle("Stream output as it is written", value=True, key="stream_output")
     st.write("---")
     generate_button = st.button("Generate Content Suite", use_container_width=True)
+    st.caption(format_cache_stats())
+    if METRICS_PANEL:
+        with st.expander("📈 Call metrics"):
+            st.dataframe(metrics_rows(), hide_index=True)
 
 # Main content area
 st.markdown('<div class="main-content">', unsafe_allow_html=True)
@@ -108,74 +83,81 @@ st.markdown('<div class="main-content">', unsafe_allow_html=True)
 if 'blog_post' not in st.session_state:
     st.session_state.blog_post = ""
 if 'accompanying_content' not in st.session_state:
-    st.session_state.accompanying_content = ""
+    st.session_state.accompanying_content = {}
+if 'blog_job' not in st.session_state:
+    st.session_state.blog_job = None
 
-if generate_button:
-    if not GEMINI_CONFIGURED:
-        st.error("Gemini API is not configured. Please check your API key.")
-    elif not blog_topic or not blog_keywords:
-        st.warning("Please provide a topic and keywords in the sidebar.")
-    else:
-        with st.spinner("Your AI is crafting the content suite... This may take a moment."):
-            st.session_state.blog_post = generate_blog_content(blog_topic, blog_keywords, blog_length, tone_of_voice, target_audience, call_to_action)
-            # We will only generate accompanying content if the blog post was successful
-            if "Error" not in st.session_state.blog_post and st.session_state.blog_post:
-                st.session_state.accompanying_content = generate_accompanying_content(st.session_state.blog_post, blog_topic, blog_keywords)
-            else:
-                st.session_state.accompanying_content = "" # Clear old content on failure
-
-# Display the generated content or a placeholder
-if st.session_state.blog_post and "Error" not in st.session_state.blog_post:
-    st.success("Your content suite has been generated successfully!")
-    
-    tab1, tab2, tab3 = st.tabs(["✍️ Blog Post", "📊 SEO & Social", "🖼️ Image Idea"])
+def show_suite(post, assets):
+    """The four result tabs; assets that have not landed yet show their waiting note."""
+    tab1, tab2, tab3, tab4 = st.tabs(["✍️ Blog Post", "📊 SEO", "📣 Social", "🖼️ Image Idea"])
 
     with tab1:
         st.subheader("Generated Blog Post")
-        st.markdown(f'<div class="generated-content-area">{st.session_state.blog_post}</div>', unsafe_allow_html=True)
+        st.markdown(f'<div class="generated-content-area">{post}</div>', unsafe_allow_html=True)
         st.download_button(
             label="📥 Download Blog as Markdown",
-            data=st.session_state.blog_post,
+            data=post,
             file_name=f"{blog_topic.replace(' ', '_').lower()}_blog.md",
             mime="text/markdown",
         )
 
-    with tab2:
-        st.subheader("SEO Analysis & Social Media Posts")
-        # ULTIMATE SAFETY CHECK: Only proceed if accompanying content exists and is not an error
-        if st.session_state.accompanying_content and "Error" not in st.session_state.accompanying_content:
-            if "## Image Prompt" in st.session_state.accompanying_content:
-                seo_content = st.session_state.accompanying_content.split("## Image Prompt")[0]
-                st.markdown(seo_content)
-            else:
-                st.markdown(st.session_state.accompanying_content) # Display all of it if separator isn't found
-        elif "Error" in st.session_state.accompanying_content:
-            st.error(f"Could not generate SEO/Social content: {st.session_state.accompanying_content}")
-        else:
-            st.info("SEO & Social content will appear here.")
-            
-    with tab3:
-        st.subheader("AI Featured Image Prompt")
-        # ULTIMATE SAFETY CHECK for this tab
-        if st.session_state.accompanying_content and "Error" not in st.session_state.accompanying_content:
-            if "## Image Prompt" in st.session_state.accompanying_content:
-                image_prompt_full_section = st.session_state.accompanying_content.split("## Image Prompt", 1)[1]
-                st.markdown("## Image Prompt" + image_prompt_full_section)
-                prompt_text_only = image_prompt_full_section.replace("Featured Image Idea", "").strip()
-                parts = prompt_text_only.split(":", 1)
-                
-                if len(parts) > 1 and parts[1].strip():
-                    actual_prompt = parts[1].strip()
-                    st.code(actual_prompt, language=None)
-                else:
-                    st.warning("Could not automatically extract a clean prompt. The full AI-generated text is shown above.")
-            else:
-                st.error("The AI did not generate an 'Image Prompt' section this time.")
-        elif "Error" in st.session_state.accompanying_content:
-            st.error(f"Could not generate an image prompt: {st.session_state.accompanying_content}")
-        else:
-            st.info("The image prompt idea will appear here.")
-            
+    for tab, name, title in ((tab2, "seo", "SEO Analysis"), (tab3, "social", "Social Media Posts"),
+                             (tab4, "image", "AI Featured Image Prompt")):
+        with tab:
+            st.subheader(title)
+            render_asset(st.empty(), name, assets.get(name))
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def watch_blog_job():
+    """
+    Polls the running suite: progress, the post as it is written, then each tab as its asset
+    lands. Only this fragment reruns while it works, and the rest of the page stays usable.
+    """
+    job = get_job(st.session_state.blog_job)
+    if not is_active(job):
+        # Finished, cancelled or expired: keep the result and redraw the page without the poller
+        if job and job["status"] == "done":
+            st.session_state.blog_post = job["result"]["post"]
+            st.session_state.accompanying_content = job["result"]["assets"]
+        elif job and job["status"] == "failed":
+            st.session_state.blog_post = f"Error from Gemini API: {job['error']}"
+        st.session_state.blog_job = None
+        st.rerun()
+    suite = job["partial"] or {}
+    progress_col, cancel_col = st.columns([5, 1])
+    progress_col.progress(job["progress"], text=job["message"] or "Waiting for a free worker...")
+    if cancel_col.button("✖️ Cancel", key="cancel_blog_job"):
+        cancel_job(job["id"])
+    if suite.get("post_done"):
+        show_suite(suite["post"], suite["assets"])
+    elif suite.get("post"):
+        st.subheader("Writing your blog post...")
+        st.markdown(suite["post"])
+
+if generate_button:
+    if not GEMINI_CONFIGURED:
+        st.error("Gemini API is not configured. Please check your API key.")
+    elif not blog_topic or not blog_keywords:
+        st.warning("Please provide a topic and keywords in the sidebar.")
+    else:
+        # The suite runs on the shared job executor, so interacting with the page no longer interrupts it
+        cancel_job(st.session_state.blog_job)
+        st.session_state.blog_job = submit_job(
+            run_blog_suite, blog_topic, blog_keywords, blog_length, tone_of_voice, target_audience, call_to_action,
+            long_form=long_form, stream=stream_output, label=f"Blog suite: {blog_topic}"
+        )
+        # Clear old content; the job's result replaces it
+        st.session_state.blog_post = ""
+        st.session_state.accompanying_content = {}
+
+# Display the running job, the generated content or a placeholder
+if st.session_state.blog_job:
+    watch_blog_job()
+
+elif st.session_state.blog_post and "Error" not in st.session_state.blog_post:
+    st.success("Your content suite has been generated successfully!")
+    show_suite(st.session_state.blog_post, st.session_state.accompanying_content)
+
 elif "Error" in st.session_state.blog_post:
     st.error(st.session_state.blog_post)
 
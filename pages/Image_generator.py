@@ -1,13 +1,12 @@
 # pages/2_🖼️_Image_Generator.py
 import streamlit as st
-import requests
-import os
-from dotenv import load_dotenv
-
-# --- Load the Pexels API Key ---
-load_dotenv()
-PEXELS_KEY = os.getenv("PEXELS_API_KEY")
-API_URL = "https://api.pexels.com/v1/search" # The official Pexels API endpoint
+from utils.pexels import PEXELS_KEY, get_image_from_pexels_api, format_pexels_status
+from utils.image_cache import fetch_photo_bytes
+from utils.metrics import METRICS_PANEL, metrics_rows, set_page
+from utils.gallery import GALLERY_COLUMNS, load_gallery_page
+from utils.image_transform import (
+    OUTPUT_FORMATS, QUALITY_LEVELS, SIZE_PRESETS, make_spec, output_file_name, transform_photo
+)
 
 # --- Helper Function for CSS ---
 def load_css():
@@ -35,48 +34,24 @@ def load_css():
         </style>
     """, unsafe_allow_html=True)
 
-# --- The function that uses the OFFICIAL Pexels API (Now with more options!) ---
-def get_image_from_pexels_api(keywords, orientation="landscape", size="large"):
-    """
-    This function uses the stable, official Pexels API to get a relevant image.
-    It now returns the full photo data dictionary or an error string.
-    """
-    if not PEXELS_KEY:
-        return "ERROR: Pexels API Key not found. Please check your .env file."
-
-    headers = {"Authorization": PEXELS_KEY}
-    params = {
-        "query": keywords,
-        "per_page": 1,
-        "orientation": orientation,
-        "size": size,
-    }
-    
-    try:
-        response = requests.get(API_URL, headers=headers, params=params, timeout=15)
-        response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
-        
-        data = response.json()
-        if data["photos"]:
-            # Return the entire first photo object
-            return data["photos"][0]
-        else:
-            return "Error: No photos found for that query. Please try different keywords."
-            
-    except requests.exceptions.RequestException as e:
-        return f"Error connecting to Pexels API: {e}"
-    except Exception as e:
-        return f"An unexpected error occurred: {e}"
-
 # --- Streamlit Page Setup ---
 st.set_page_config(page_title="Image Finder", page_icon="🖼️", layout="wide")
+set_page("Image Finder")
 load_css()
+st.sidebar.caption(format_pexels_status())
+if METRICS_PANEL:
+    with st.sidebar.expander("📈 Call metrics"):
+        st.dataframe(metrics_rows(), hide_index=True)
 
 st.title("🖼️ Pexels Image Finder")
 
 # Initialize session state to store the image data
 if "pexels_data" not in st.session_state:
     st.session_state.pexels_data = None
+if "gallery_query" not in st.session_state:
+    st.session_state.gallery_query = None
+if "gallery_prefetched" not in st.session_state:
+    st.session_state.gallery_prefetched = set()  # (keywords, orientation, size, page) already warmed
 
 # --- Main App Logic ---
 if not PEXELS_KEY:
@@ -105,12 +80,23 @@ else:
             help="Note: 'large' is 24MP, 'medium' is 12MP, 'small' is 4MP. This does not refer to pixel dimensions."
         )
 
-        generate_button = st.button("Find Photo", type="primary")
+        gallery_mode = st.toggle(
+            "🗂️ Gallery mode",
+            help="Browse a page of results as thumbnails and pick the one you like."
+        )
+
+        generate_button = st.button("Find Photos" if gallery_mode else "Find Photo", type="primary")
 
         if generate_button:
             if not image_keywords:
                 st.warning("Please enter some keywords.")
                 st.session_state.pexels_data = None # Clear previous image
+            elif gallery_mode:
+                # The gallery below loads the page; the large version waits until a photo is selected
+                st.session_state.gallery_query = {
+                    "keywords": image_keywords, "orientation": orientation, "size": size, "page": 1
+                }
+                st.session_state.pexels_data = None
             else:
                 with st.spinner("Searching the Pexels library..."):
                     result = get_image_from_pexels_api(image_keywords, orientation, size)
@@ -123,31 +109,73 @@ else:
     with col2:
         if st.session_state.pexels_data:
             photo_data = st.session_state.pexels_data
-            image_url = photo_data['src']['large2x'] # Use a high-res version for display
             photographer = photo_data['photographer']
             photographer_url = photo_data['photographer_url']
             pexels_url = photo_data['url']
 
             st.subheader("Your Image:")
-            # --- THIS IS THE CORRECTED LINE ---
-            st.image(image_url, use_container_width=True)
-            
+            # The server downloads the high-res version once; reruns, the preview and the
+            # download are all served from the image cache
+            try:
+                st.image(fetch_photo_bytes(photo_data, "large2x"), use_container_width=True)
+            except Exception as e:
+                st.error(f"Could not load the image: {e}")
+
             # Attribution and Links
             st.markdown(f"**Photo by [{photographer}]({photographer_url}) on [Pexels]({pexels_url})**")
-            
-            # Download Button
-            try:
-                # Fetch the image content for the download button
-                image_response = requests.get(image_url)
-                image_bytes = image_response.content
+
+            # Download Button: the bytes are only produced when the button is clicked
+            st.download_button(
+                label="📥 Download Photo",
+                data=lambda: fetch_photo_bytes(photo_data, "large2x"),
+                file_name=f"pexels_{photo_data['id']}.jpg",
+                mime="image/jpeg"
+            )
+
+            # Blog-ready version: cropped, resized and re-encoded on the server, cached per photo and spec
+            with st.expander("🛠️ Blog-ready version", expanded=True):
+                presets = SIZE_PRESETS[orientation]
+                preset = st.selectbox("Size preset:", list(presets))
+                output_format = st.radio("Format:", list(OUTPUT_FORMATS), horizontal=True)
+                quality = st.select_slider("Quality:", options=list(QUALITY_LEVELS), value="Balanced")
+                spec = make_spec(*presets[preset], output_format, quality)
                 st.download_button(
-                    label="📥 Download Photo",
-                    data=image_bytes,
-                    file_name=f"pexels_{photo_data['id']}.jpg",
-                    mime="image/jpeg"
+                    label=f"📥 Download {spec['width']}×{spec['height']} {output_format.split()[0]}",
+                    data=lambda: transform_photo(photo_data, spec),
+                    file_name=output_file_name(photo_data, spec),
+                    mime=OUTPUT_FORMATS[output_format]["mime"],
+                    key="download_transformed"
                 )
-            except Exception as e:
-                st.error(f"Could not prepare image for download: {e}")
 
         else:
-            st.info("Your generated image will appear here.")
\ No newline at end of file
+            st.info("Your generated image will appear here.")
+
+    # --- Gallery: one page of thumbnails, the next page prefetched in the background ---
+    if gallery_mode and st.session_state.gallery_query:
+        query = st.session_state.gallery_query
+        st.divider()
+        with st.spinner("Loading thumbnails..."):
+            gallery = load_gallery_page(**query, prefetched=st.session_state.gallery_prefetched)
+        if isinstance(gallery, str):
+            st.error(f"Could not retrieve photos. Details: {gallery}")
+        else:
+            st.caption(f"Page {gallery['page']} · {gallery['total_results']:,} results for \"{query['keywords']}\"")
+            columns = st.columns(GALLERY_COLUMNS)
+            for i, (photo, thumbnail) in enumerate(zip(gallery["photos"], gallery["thumbnails"])):
+                with columns[i % GALLERY_COLUMNS]:
+                    # Fall back to the URL if the thumbnail download failed
+                    st.image(thumbnail or photo["src"]["tiny"], use_container_width=True)
+                    # Overlapping queries can put the same photo on a page twice; the index keeps keys unique
+                    if st.button("Select", key=f"select_{i}_{photo['id']}"):
+                        st.session_state.pexels_data = photo
+                        st.rerun()
+
+            prev_col, next_col = st.columns(2)
+            with prev_col:
+                if st.button("◀ Previous page", disabled=gallery["page"] <= 1):
+                    st.session_state.gallery_query = {**query, "page": gallery["page"] - 1}
+                    st.rerun()
+            with next_col:
+                if st.button("Next page ▶", disabled=not gallery["has_next"]):
+                    st.session_state.gallery_query = {**query, "page": gallery["page"] + 1}
+                    st.rerun()
@@ -1,21 +1,15 @@
 # pages/4_🌐_Translator.py
 import streamlit as st
-import google.generativeai as genai
-import os
-from dotenv import load_dotenv
-
-# --- Load the Gemini API Key ---
-try:
-    load_dotenv()
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        GEMINI_CONFIGURED = False
-    else:
-        genai.configure(api_key=api_key)
-        GEMINI_CONFIGURED = True
-except Exception as e:
-    GEMINI_CONFIGURED = False
-    print(f"Error configuring Gemini: {e}")
+from utils.gemini_client import is_configured
+from utils.translation import translate_with_memory, translate_into_many, combine_translations
+from utils.doc_translation import DOCUMENT_EXTENSIONS, translate_document_job
+from utils.jobs import JOB_POLL_SECONDS, cancel_job, get_job, is_active, submit_job
+from utils.language_id import resolve_source_language
+from utils.response_cache import format_cache_stats
+from utils.metrics import METRICS_PANEL, metrics_rows, set_page
+
+# --- Gemini Configuration (once per process, via the shared client) ---
+GEMINI_CONFIGURED = is_configured()
 
 # --- Helper Function for CSS ---
 def load_css():
@@ -46,47 +40,72 @@ def load_css():
         </style>
     """, unsafe_allow_html=True)
 
-# --- The NEW Core Translation Function ---
-def translate_text_with_gemini(source_text, source_lang, target_lang):
-    """
-    Uses the Gemini API to translate text between any two languages.
-    """
-    if not GEMINI_CONFIGURED:
-        return "Error: Gemini API is not configured."
+# --- Helper Functions for Auto-Detect ---
+def resolve_source(text):
+    """Resolves "Auto-Detect" locally before any request; low-confidence guesses are left to Gemini."""
+    source_lang, detected, confidence = resolve_source_language(text, st.session_state.source_lang)
+    st.session_state.detection = (detected, confidence, source_lang != "Auto-Detect") if detected else None
+    return source_lang
 
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    
-    # Create a dynamic, robust prompt
-    if source_lang == "Auto-Detect":
-        prompt = f"""
-        You are a highly intelligent language identification and translation service.
-        First, identify the language of the following text.
-        Then, translate the identified text into {target_lang}.
-        Provide ONLY the final translated text, without any explanation, headers, or the identified language name.
-        If you cannot determine the language, respond with 'Error: Could not identify the source language.'
-
-        Text to translate:
-        ---
-        {source_text}
-        ---
-        """
+def show_detection():
+    """Caption describing what Auto-Detect decided for the last translation."""
+    if st.session_state.source_lang != "Auto-Detect" or not st.session_state.detection:
+        return
+    detected, confidence, resolved = st.session_state.detection
+    if resolved:
+        st.caption(f"🔎 Detected language: {detected} ({confidence:.0%} confidence)")
     else:
-        prompt = f"""
-        You are an expert translator. Your ONLY task is to translate the following text from {source_lang} into {target_lang}.
-        Do not add any explanations, introductions, or any other text in your response.
-        Provide ONLY the {target_lang} translation.
-
-        {source_lang} Text:
-        ---
-        {source_text}
-        ---
-        """
-    
-    try:
-        response = model.generate_content(prompt)
-        return response.text.strip()
-    except Exception as e:
-        return f"An error occurred during translation: {e}"
+        st.caption(f"🔎 Not sure about the language (best guess: {detected}, {confidence:.0%}); Gemini detected it instead")
+
+def show_translation(text):
+    """One language's result: the text with a copy button, or its error."""
+    if text.startswith("An error occurred"):
+        st.error(text)
+    else:
+        st.code(text, language=None)
+
+# --- Background Job Pollers (only the fragment reruns while a job works) ---
+def show_job_progress(job, cancel_key):
+    progress_col, cancel_col = st.columns([5, 1])
+    progress_col.progress(job["progress"], text=job["message"] or "Waiting for a free worker...")
+    if cancel_col.button("✖️ Cancel", key=cancel_key):
+        cancel_job(job["id"])
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def watch_document_job():
+    job = get_job(st.session_state.document_job)
+    if not is_active(job):
+        # Finished, cancelled or expired: keep the result and redraw the page without the poller
+        if job and job["status"] == "done":
+            st.session_state.document_translation = job["result"]
+        elif job and job["status"] == "failed":
+            st.session_state.document_translation = f"An error occurred during translation: {job['error']}"
+        st.session_state.document_job = None
+        st.rerun()
+    show_job_progress(job, "cancel_document_job")
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def watch_multi_job():
+    """One tab per language, filled as each one finishes."""
+    langs = st.session_state.multi_job_langs
+    job = get_job(st.session_state.multi_job)
+    if not is_active(job):
+        if job and job["status"] == "done":
+            st.session_state.multi_translations = job["result"]
+        elif job and job["status"] == "failed":
+            st.session_state.multi_translations = {
+                lang: f"An error occurred during translation: {job['error']}" for lang in langs
+            }
+        st.session_state.multi_job = None
+        st.rerun()
+    show_job_progress(job, "cancel_multi_job")
+    results = job["partial"] or {}
+    for tab, lang in zip(st.tabs(langs), langs):
+        with tab:
+            if lang in results:
+                show_translation(results[lang])
+            else:
+                st.info(f"Translating into {lang}...")
 
 # --- Language Options ---
 LANGUAGES = {
@@ -105,7 +124,12 @@ LANGUAGES = {
 
 # --- Streamlit Page Setup ---
 st.set_page_config(page_title="Universal Translator", page_icon="🌐", layout="wide")
+set_page("Translator")
 load_css()
+st.sidebar.caption(format_cache_stats())
+if METRICS_PANEL:
+    with st.sidebar.expander("📈 Call metrics"):
+        st.dataframe(metrics_rows(), hide_index=True)
 
 st.title("🌐 Universal Translator")
 st.markdown("Translate text between multiple languages, powered by Google Gemini.")
@@ -119,11 +143,32 @@ if 'source_lang' not in st.session_state:
     st.session_state.source_lang = "Auto-Detect"
 if 'target_lang' not in st.session_state:
     st.session_state.target_lang = "Tamil"
+if 'translation_stats' not in st.session_state:
+    st.session_state.translation_stats = None
+if 'detection' not in st.session_state:
+    st.session_state.detection = None
+if 'target_langs' not in st.session_state:
+    st.session_state.target_langs = ["Spanish", "French", "German"]
+if 'multi_translations' not in st.session_state:
+    st.session_state.multi_translations = {}
+if 'document_translation' not in st.session_state:
+    st.session_state.document_translation = None
+if 'document_job' not in st.session_state:
+    st.session_state.document_job = None
+if 'multi_job' not in st.session_state:
+    st.session_state.multi_job = None
+    st.session_state.multi_job_langs = []
 
 # --- Main App Logic ---
 if not GEMINI_CONFIGURED:
     st.error("CRITICAL ERROR: The Gemini API key is not configured. Please add it to your .env file and restart.")
 else:
+    document_mode = st.radio("Translate:", ["✍️ Text", "📄 Document"], horizontal=True) == "📄 Document"
+    multi_target = not document_mode and st.toggle(
+        "🌍 Translate into several languages at once",
+        help="All selected languages are translated concurrently, so ten take about as long as the slowest one."
+    )
+
     # --- UI Layout: Language Selection and Swap Button ---
     col1, col2, col3 = st.columns([5, 1, 5])
     
@@ -137,10 +182,14 @@ else:
     with col2:
         st.write("") # for vertical alignment
         st.write("")
-        if st.button("⇄", help="Swap languages"):
+        if not multi_target and st.button("⇄", help="Swap languages"):
             # Swap languages
             source, target = st.session_state.source_lang, st.session_state.target_lang
-            st.session_state.source_lang, st.session_state.target_lang = target, source
+            if source == "Auto-Detect" and st.session_state.detection:
+                # "Auto-Detect" is not a valid target: swap in the language that was detected
+                source = st.session_state.detection[0]
+            if source != "Auto-Detect" and source in LANGUAGES:
+                st.session_state.source_lang, st.session_state.target_lang = target, source
             # Swap text
             source_text, target_text = st.session_state.source_text, st.session_state.translated_text
             st.session_state.source_text, st.session_state.translated_text = target_text, source_text
@@ -150,51 +199,160 @@ else:
     with col3:
         # Filter out "Auto-Detect" from target languages
         target_lang_options = [lang for lang in LANGUAGES.keys() if lang != "Auto-Detect"]
-        st.session_state.target_lang = st.selectbox(
-            "To:", options=target_lang_options, 
-            key='select_target_lang',
-            index=target_lang_options.index(st.session_state.target_lang)
+        if multi_target:
+            st.session_state.target_langs = st.multiselect(
+                "To:", options=target_lang_options,
+                default=st.session_state.target_langs,
+                key='select_target_langs'
+            )
+        else:
+            st.session_state.target_lang = st.selectbox(
+                "To:", options=target_lang_options, 
+                key='select_target_lang',
+                index=target_lang_options.index(st.session_state.target_lang)
+            )
+
+    if document_mode:
+        uploaded_doc = st.file_uploader(
+            "Upload a document (DOCX, PPTX or PDF)",
+            type=[extension.lstrip(".") for extension in DOCUMENT_EXTENSIONS]
         )
+        st.caption("DOCX and PPTX files keep their layout, tables and slides. PDFs come back as a DOCX, one section per page.")
 
-    # --- UI Layout: Text Areas ---
-    area1, area2 = st.columns(2)
-    
-    with area1:
+        if st.button("Translate Document", type="primary"):
+            if uploaded_doc is None:
+                st.warning("Please upload a document to translate.")
+            else:
+                # Runs on the shared job executor, so changing widgets meanwhile does not interrupt it
+                cancel_job(st.session_state.document_job)
+                st.session_state.document_job = submit_job(
+                    translate_document_job,
+                    uploaded_doc.name,
+                    uploaded_doc.getvalue(),
+                    st.session_state.source_lang,
+                    st.session_state.target_lang,
+                    label=f"Document translation: {uploaded_doc.name}"
+                )
+                st.session_state.document_translation = None
+
+        if st.session_state.document_job:
+            watch_document_job()
+
+        result = st.session_state.document_translation
+        if isinstance(result, str):
+            st.error(result)
+        elif result:
+            st.success(f"Translated {result['units']} text blocks into {result['file_name']}")
+            if result["reused"]:
+                st.caption(f"♻️ {result['reused']} of {result['units']} blocks reused from translation memory")
+            st.download_button(
+                label="📥 Download translated document",
+                data=result["data"],
+                file_name=result["file_name"],
+                mime=result["mime"]
+            )
+    elif multi_target:
         st.session_state.source_text = st.text_area(
-            "Enter text to translate:", 
-            value=st.session_state.source_text, 
-            height=250, 
+            "Enter text to translate:",
+            value=st.session_state.source_text,
+            height=250,
             key="source_text_area"
         )
+        target_langs = st.session_state.target_langs
 
-    with area2:
-        st.text_area(
-            "Translated text:", 
-            value=st.session_state.translated_text, 
-            height=250, 
-            key="translated_text_area",
-            disabled=True
-        )
-
-    # --- Translate Button and Output Logic ---
-    if st.button("Translate", type="primary"):
-        if not st.session_state.source_text.strip():
+        # --- Fan-out Translation: one tab per language, filled as each one finishes ---
+        translate_all = st.button(f"Translate into {len(target_langs)} languages", type="primary")
+        if translate_all and not st.session_state.source_text.strip():
             st.warning("Please enter some text to translate.")
-        else:
-            with st.spinner("Translating..."):
-                translation_result = translate_text_with_gemini(
-                    st.session_state.source_text,
-                    st.session_state.source_lang,
-                    st.session_state.target_lang
+            translate_all = False
+        elif translate_all and not target_langs:
+            st.warning("Please choose at least one target language.")
+            translate_all = False
+
+        if translate_all:
+            # Runs on the shared job executor; the tabs below fill in as each language lands
+            cancel_job(st.session_state.multi_job)
+            st.session_state.multi_job = submit_job(
+                translate_into_many,
+                st.session_state.source_text,
+                resolve_source(st.session_state.source_text),
+                target_langs,
+                remember_reverse=st.session_state.source_lang != "Auto-Detect",
+                label=f"Translation into {len(target_langs)} languages"
+            )
+            st.session_state.multi_job_langs = list(target_langs)
+            st.session_state.multi_translations = {}
+
+        if st.session_state.multi_job:
+            watch_multi_job()
+        elif st.session_state.multi_translations:
+            shown = list(st.session_state.multi_translations)
+            for tab, lang in zip(st.tabs(shown), shown):
+                with tab:
+                    show_translation(st.session_state.multi_translations[lang])
+
+            show_detection()
+            finished = {lang: text for lang, text in st.session_state.multi_translations.items()
+                        if not text.startswith("An error occurred")}
+            if finished:
+                st.download_button(
+                    label="📥 Download all translations",
+                    data=combine_translations(finished),
+                    file_name="translations.txt",
+                    mime="text/plain"
                 )
-                st.session_state.translated_text = translation_result
-                st.rerun() # Rerun to update the disabled text area
+    else:
+        # --- UI Layout: Text Areas ---
+        area1, area2 = st.columns(2)
+    
+        with area1:
+            st.session_state.source_text = st.text_area(
+                "Enter text to translate:", 
+                value=st.session_state.source_text, 
+                height=250, 
+                key="source_text_area"
+            )
 
-    # --- Display with Copy Button if there is translated text ---
-    if st.session_state.translated_text:
-        if "Error:" in st.session_state.translated_text:
-            st.error(st.session_state.translated_text)
-        else:
-            # Using st.code provides a built-in copy button!
-            st.subheader("Result with Copy Option")
-            st.code(st.session_state.translated_text, language=None)
\ No newline at end of file
+        with area2:
+            st.text_area(
+                "Translated text:", 
+                value=st.session_state.translated_text, 
+                height=250, 
+                key="translated_text_area",
+                disabled=True
+            )
+
+        # --- Translate Button and Output Logic ---
+        if st.button("Translate", type="primary"):
+            if not st.session_state.source_text.strip():
+                st.warning("Please enter some text to translate.")
+            else:
+                with st.spinner("Translating..."):
+                    # Only sentences the translation memory has not seen before are sent to Gemini
+                    try:
+                        result = translate_with_memory(
+                            st.session_state.source_text,
+                            resolve_source(st.session_state.source_text),
+                            st.session_state.target_lang,
+                            # A detected source may be wrong: only a chosen one is remembered both ways
+                            remember_reverse=st.session_state.source_lang != "Auto-Detect"
+                        )
+                        st.session_state.translated_text = result["text"]
+                        st.session_state.translation_stats = result
+                    except Exception as e:
+                        st.session_state.translated_text = f"Error: An error occurred during translation: {e}"
+                        st.session_state.translation_stats = None
+                    st.rerun() # Rerun to update the disabled text area
+
+        # --- Display with Copy Button if there is translated text ---
+        if st.session_state.translated_text:
+            if "Error:" in st.session_state.translated_text:
+                st.error(st.session_state.translated_text)
+            else:
+                # Using st.code provides a built-in copy button!
+                st.subheader("Result with Copy Option")
+                st.code(st.session_state.translated_text, language=None)
+                stats = st.session_state.translation_stats
+                if stats and stats["segments"]:
+                    st.caption(f"♻️ {stats['reused']} of {stats['segments']} segments reused from translation memory")
+                show_detection()
\ No newline at end of file
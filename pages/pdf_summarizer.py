@@ -1,28 +1,16 @@
 # pages/3_📄_Document_Q&A.py
 import streamlit as st
-import google.generativeai as genai
-import os
-from dotenv import load_dotenv
-
-# Import the necessary libraries to read different file types
-from pypdf import PdfReader
-from docx import Document
-from pptx import Presentation
-import json # To format chat history for the prompt
-
-# --- Load the Gemini API Key ---
-try:
-    load_dotenv()
-    # Ensure the API key is loaded and configured
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        GEMINI_CONFIGURED = False
-    else:
-        genai.configure(api_key=api_key)
-        GEMINI_CONFIGURED = True
-except Exception as e:
-    GEMINI_CONFIGURED = False
-    print(f"Error configuring Gemini: {e}")
+from utils.gemini_client import is_configured
+from utils.response_cache import format_cache_stats
+from utils.doc_qa import get_answer_from_gemini, stream_answer_from_gemini
+from utils.chat_history import ChatHistoryManager
+from utils.summarizer import run_summary_job, SUMMARY_WORKERS
+from utils.jobs import JOB_POLL_SECONDS, cancel_job, get_job, is_active, submit_job
+from utils.doc_store import load_document, load_document_index
+from utils.metrics import METRICS_PANEL, metrics_rows, set_page
+
+# --- Gemini Configuration (once per process, via the shared client) ---
+GEMINI_CONFIGURED = is_configured()
 
 # --- Helper Function for CSS ---
 def load_css():
@@ -50,80 +38,20 @@ def load_css():
         </style>
     """, unsafe_allow_html=True)
 
-# --- Core Text Extraction Function (Remains the same, but with better error handling) ---
-def extract_text_from_file(uploaded_file):
-    """Extracts text from PDF, DOCX, PPTX, and TXT files."""
-    file_extension = os.path.splitext(uploaded_file.name)[1].lower()
-    text = ""
-    try:
-        if file_extension == ".pdf":
-            pdf_reader = PdfReader(uploaded_file)
-            for page in pdf_reader.pages:
-                text += page.extract_text() or ""
-        elif file_extension == ".docx":
-            doc = Document(uploaded_file)
-            for para in doc.paragraphs:
-                text += para.text + "\n"
-        elif file_extension == ".pptx":
-            pres = Presentation(uploaded_file)
-            for slide in pres.slides:
-                for shape in slide.shapes:
-                    if hasattr(shape, "text"):
-                        text += shape.text + "\n"
-        elif file_extension == ".txt":
-            text = uploaded_file.read().decode("utf-8")
-        
-        if not text.strip():
-            return "Error: No text could be extracted from the document. It might be empty or scanned."
-        return text
-    except Exception as e:
-        return f"Error reading file: {e}"
-
-# --- Gemini API Functions (Updated for Chat) ---
-def summarize_text_with_gemini(text):
-    if not GEMINI_CONFIGURED: return "Error: Gemini API not configured."
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    prompt = f"You are an expert summarizer. Please provide a detailed yet concise summary of the following document text, highlighting the key points, main arguments, and any conclusions.\n\nDOCUMENT TEXT:\n---\n{text}\n---"
-    try:
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        return f"An error occurred with the Gemini API: {e}"
-
-def get_answer_from_gemini(document_text, chat_history, user_question):
-    if not GEMINI_CONFIGURED: return "Error: Gemini API not configured."
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    
-    # Format the chat history for the prompt
-    history_str = json.dumps(chat_history, indent=2)
-
-    prompt = f"""
-    You are a helpful AI assistant specialized in analyzing documents.
-    Your task is to answer the user's question based *only* on the provided document text.
-    Consider the previous conversation for context. If the answer is not in the document, state that clearly.
-
-    **DOCUMENT TEXT:**
-    ---
-    {document_text}
-    ---
-
-    **CONVERSATION HISTORY:**
-    ---
-    {history_str}
-    ---
-    
-    **USER'S LATEST QUESTION:**
-    {user_question}
-    """
-    try:
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        return f"An error occurred with the Gemini API: {e}"
-
 # --- Streamlit Page Setup ---
 st.set_page_config(page_title="Document Q&A", page_icon="📄", layout="wide")
+set_page("Doc Q&A")
 load_css()
+stream_output = st.sidebar.toggle("Stream responses as they are written", value=True, key="stream_output")
+with st.sidebar.expander("📑 Page Range"):
+    st.caption("Limit PDF pages or PPTX slides to read. Leave at 0 to read everything.")
+    first_page = st.number_input("First page", min_value=0, value=0, step=1, key="first_page")
+    last_page = st.number_input("Last page", min_value=0, value=0, step=1, key="last_page")
+page_range = (int(first_page), int(last_page)) if (first_page or last_page) else None
+st.sidebar.caption(format_cache_stats())
+if METRICS_PANEL:
+    with st.sidebar.expander("📈 Call metrics"):
+        st.dataframe(metrics_rows(), hide_index=True)
 
 st.title("📄 Document Analysis Suite")
 st.write("Upload a document to summarize it or chat about its contents.")
@@ -132,7 +60,37 @@ st.write("Upload a document to summarize it or chat about its contents.")
 if "document_text" not in st.session_state:
     st.session_state.document_text = None
     st.session_state.document_name = None
+    st.session_state.document_index = None
+    st.session_state.document_key = None
+    st.session_state.document_upload = None
     st.session_state.chat_messages = []
+    st.session_state.chat_memory = ChatHistoryManager()
+if "summary_text" not in st.session_state:
+    st.session_state.summary_text = None
+    st.session_state.summary_name = None
+if "summary_job" not in st.session_state:
+    st.session_state.summary_job = None
+    st.session_state.summary_error = None
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def watch_summary_job():
+    """Polls the running summary; the chat tab stays usable while it works."""
+    job = get_job(st.session_state.summary_job)
+    if not is_active(job):
+        # Finished, cancelled or expired: keep the result and redraw the page without the poller
+        if job and job["status"] == "done":
+            st.session_state.summary_text = job["result"]
+        elif job and job["status"] == "failed":
+            # Unreadable files and Gemini errors both fail the job with their message
+            st.session_state.summary_error = job["error"]
+        st.session_state.summary_job = None
+        st.rerun()
+    progress_col, cancel_col = st.columns([5, 1])
+    progress_col.progress(job["progress"], text=job["message"] or "Waiting for a free worker...")
+    if cancel_col.button("✖️ Cancel", key="cancel_summary_job"):
+        cancel_job(job["id"])
+    if job["partial"]:
+        st.markdown(job["partial"])
 
 # --- Main App Logic ---
 if not GEMINI_CONFIGURED:
@@ -148,16 +106,32 @@ else:
             type=["pdf", "docx", "pptx", "txt"],
             key="summary_uploader"
         )
+        summary_workers = st.slider(
+            "Parallel summary workers", 1, 16, SUMMARY_WORKERS,
+            help="Large documents are split into chunks that are summarized concurrently, then merged."
+        )
         if summary_file:
             if st.button("✨ Generate Summary", type="primary"):
-                with st.spinner("Reading and summarizing your document..."):
-                    extracted_text = extract_text_from_file(summary_file)
-                    if "Error:" not in extracted_text:
-                        summary = summarize_text_with_gemini(extracted_text)
-                        st.subheader(f"Summary of `{summary_file.name}`")
-                        st.markdown(summary)
-                    else:
-                        st.error(extracted_text)
+                # Reading and summarizing run on the shared job executor, so using the chat
+                # tab (or any other widget) meanwhile no longer interrupts them
+                cancel_job(st.session_state.summary_job)
+                st.session_state.summary_job = submit_job(
+                    run_summary_job, summary_file, page_range, summary_workers, stream=stream_output,
+                    label=f"Summary: {summary_file.name}"
+                )
+                st.session_state.summary_text = None
+                st.session_state.summary_error = None
+                st.session_state.summary_name = summary_file.name
+            if st.session_state.summary_name == summary_file.name:
+                if st.session_state.summary_job:
+                    st.subheader(f"Summary of `{summary_file.name}`")
+                    watch_summary_job()
+                elif st.session_state.summary_error:
+                    st.error(st.session_state.summary_error)
+                elif st.session_state.summary_text:
+                    # Keep the last summary on screen across reruns
+                    st.subheader(f"Summary of `{summary_file.name}`")
+                    st.markdown(st.session_state.summary_text)
 
     with tab2:
         st.header("Chat with Your Document")
@@ -176,15 +150,35 @@ else:
             if st.button("🗑️ Clear & Start Over"):
                 st.session_state.document_text = None
                 st.session_state.document_name = None
+                st.session_state.document_index = None
+                st.session_state.document_key = None
+                st.session_state.document_upload = None
                 st.session_state.chat_messages = []
+                st.session_state.chat_memory = ChatHistoryManager()
                 st.rerun()
 
-        # Logic to process the uploaded file for the chat
-        if qa_file and (st.session_state.document_name != qa_file.name):
+        # Logic to process the uploaded file for the chat.
+        # Each new upload is looked up by content hash, so a different file with the same
+        # name is never reused and a file already read (in either tab) loads instantly.
+        if qa_file and st.session_state.document_upload != (qa_file.file_id, page_range):
             with st.spinner(f"Reading `{qa_file.name}`..."):
-                st.session_state.document_text = extract_text_from_file(qa_file)
+                document = load_document(qa_file, page_range)
+                if isinstance(document, str):
+                    st.session_state.document_text = document
+                    st.session_state.document_index = None
+                    st.session_state.document_key = None
+                    st.session_state.chat_messages = []
+                    st.session_state.chat_memory = ChatHistoryManager()
+                else:
+                    # Index once per document so each question only sends its top-k chunks
+                    st.session_state.document_text = document["text"]
+                    st.session_state.document_index = load_document_index(document)
+                    if st.session_state.document_key != document["key"]:
+                        st.session_state.chat_messages = [] # Reset chat history for new doc
+                        st.session_state.chat_memory = ChatHistoryManager()
+                    st.session_state.document_key = document["key"]
                 st.session_state.document_name = qa_file.name
-                st.session_state.chat_messages = [] # Reset chat history for new doc
+                st.session_state.document_upload = (qa_file.file_id, page_range)
 
         # Main chat interface
         if st.session_state.document_text:
@@ -203,6 +197,8 @@ else:
 
                 # Get new user input
                 if prompt := st.chat_input("Ask a question about your document..."):
+                    # The history sent with the question stops just before it, so it is not sent twice
+                    previous_messages = list(st.session_state.chat_messages)
                     # Add user message to chat history
                     st.session_state.chat_messages.append({"role": "user", "content": prompt})
                     with st.chat_message("user"):
@@ -210,13 +206,26 @@ else:
 
                     # Get and display model response
                     with st.chat_message("assistant"):
-                        with st.spinner("Analyzing..."):
-                            response = get_answer_from_gemini(
-                                st.session_state.document_text,
-                                st.session_state.chat_messages,
-                                prompt
-                            )
-                            st.markdown(response)
+                        if stream_output:
+                            try:
+                                response = st.write_stream(stream_answer_from_gemini(
+                                    st.session_state.document_index,
+                                    st.session_state.chat_memory,
+                                    previous_messages,
+                                    prompt
+                                ))
+                            except Exception as e:
+                                response = f"An error occurred with the Gemini API: {e}"
+                                st.markdown(response)
+                        else:
+                            with st.spinner("Analyzing..."):
+                                response = get_answer_from_gemini(
+                                    st.session_state.document_index,
+                                    st.session_state.chat_memory,
+                                    previous_messages,
+                                    prompt
+                                )
+                                st.markdown(response)
                     # Add model response to chat history
                     st.session_state.chat_messages.append({"role": "assistant", "content": response})
         else:
@@ -0,0 +1,50 @@
+# tests/test_language_id.py
+import pytest
+
+from utils.language_id import detect_language, resolve_source_language
+
+# Sentences that are not in the model's samples
+SUPPORTED = {
+    "English": "The report shows that sales increased last quarter, mainly because of strong demand in Europe.",
+    "Spanish": "Me gustaría reservar una mesa para dos personas mañana por la noche, si todavía tienen sitio.",
+    "French": "Le rapport montre que les ventes ont augmenté au dernier trimestre, surtout grâce à la demande en Europe.",
+    "German": "Ich möchte für morgen Abend einen Tisch für zwei Personen reservieren, wenn noch Platz ist.",
+    "Korean": "내일 저녁에 두 사람 자리를 예약하고 싶습니다.",
+    "Japanese": "明日の夜、二人で予約をお願いしたいです。",
+}
+
+# Latin-script languages the app does not offer; they used to resolve to a close neighbour
+UNSUPPORTED = {
+    "Italian": "Il rapporto mostra che le vendite sono aumentate nell'ultimo trimestre, soprattutto grazie alla domanda.",
+    "Portuguese": "Eu gostaria de reservar uma mesa para duas pessoas amanhã à noite, se ainda houver lugar.",
+    "Dutch": "Het rapport laat zien dat de verkoop in het laatste kwartaal is gestegen, vooral door de vraag.",
+    "Finnish": "Haluaisin varata pöydän kahdelle hengelle huomisillaksi, jos teillä on vielä tilaa.",
+    "Turkish": "Yarın akşam için iki kişilik bir masa ayırtmak istiyorum, eğer hâlâ yeriniz varsa.",
+}
+
+
+@pytest.mark.parametrize("language", SUPPORTED)
+def test_supported_language_resolves(language):
+    source_lang, detected, confidence = resolve_source_language(SUPPORTED[language], "Auto-Detect")
+    assert (source_lang, detected) == (language, language)
+    assert confidence >= 0.8
+
+
+@pytest.mark.parametrize("language", UNSUPPORTED)
+def test_unsupported_language_is_left_to_the_model(language):
+    source_lang, _, confidence = resolve_source_language(UNSUPPORTED[language], "Auto-Detect")
+    assert source_lang == "Auto-Detect"
+    assert confidence < 0.8
+
+
+def test_background_languages_are_never_returned():
+    language, _ = detect_language(UNSUPPORTED["Italian"])
+    assert language in SUPPORTED
+
+
+def test_explicit_source_is_kept():
+    assert resolve_source_language(UNSUPPORTED["Dutch"], "German") == ("German", None, 0.0)
+
+
+def test_no_letters():
+    assert detect_language("12345 !!!") == (None, 0.0)
@@ -0,0 +1,2 @@
+# utils/__init__.py
+# Shared helpers used by Welcome.py and the Streamlit pages.
@@ -0,0 +1,312 @@
+# utils/blog.py
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils.gemini_client import generate_text, stream_text
+from utils.metrics import propagate
+from utils.jobs import JobCancelled
+
+# --- AI Generation Functions ---
+
+def build_blog_prompt(topic, keywords, length, tone, audience, cta):
+    """Builds the prompt for the main blog post."""
+    return f"""
+        You are a world-class blog writer, content strategist, and SEO expert. Your task is to write a comprehensive, engaging, and well-structured blog post.
+
+        **Primary Topic:** "{topic}"
+        **Keywords to strategically integrate:** "{keywords}"
+        **Target Audience:** "{audience}"
+        **Tone of Voice:** "{tone}"
+        **Target Length:** Approximately {length} words.
+        **Call to Action:** Conclude the blog post by naturally incorporating this call to action: "{cta}"
+
+        **Strict Structure Requirements:**
+        - **Main Title (H1):** Start with one, and only one, H1 title (using a single # in markdown). The title must be catchy, SEO-friendly, and directly related to the topic.
+        - **Introduction:** A short, compelling introduction that hooks the reader and states the blog's purpose.
+        - **Body Content:** Use multiple H2 headings (##) to divide the main sections. Use H3 subheadings (###) where necessary for more detailed points. Use lists, bold text, and italics to improve readability.
+        - **Conclusion:** Provide a concise summary of the key points and seamlessly integrate the call to action.
+
+        **Output Format:** Return ONLY the raw markdown text for the blog post. Do not include any of your own commentary before or after the markdown content.
+    """
+
+def generate_blog_content(topic, keywords, length, tone, audience, cta):
+    """Generates the main blog post content."""
+    prompt = build_blog_prompt(topic, keywords, length, tone, audience, cta)
+    try:
+        return generate_text(prompt)
+    except Exception as e:
+        return f"Error from Gemini API: {str(e)}"
+
+def stream_blog_content(topic, keywords, length, tone, audience, cta):
+    """Yields the main blog post chunk by chunk as Gemini streams it back."""
+    prompt = build_blog_prompt(topic, keywords, length, tone, audience, cta)
+    yield from stream_text(prompt)
+
+# --- Structured Output Helpers ---
+
+JSON_CONFIG = {"response_mime_type": "application/json"}
+
+
+def parse_json_response(text):
+    """Parses a JSON reply, tolerating a ```json fence around it."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    return json.loads(text)
+
+
+def generate_json(prompt, required_keys):
+    """
+    Runs a JSON-mode request and checks that every expected key came back. The check runs
+    before the reply is cached, so a truncated or incomplete reply is retried next time.
+    """
+    def parse_checked(text):
+        data = parse_json_response(text)
+        missing = [key for key in required_keys if not data.get(key)]
+        if missing:
+            raise ValueError(f"The response is missing: {', '.join(missing)}")
+        return data
+    return parse_checked(generate_text(prompt, JSON_CONFIG, validate=parse_checked))
+
+# --- Accompanying Content (SEO, social posts, image prompt) ---
+
+def build_asset_prompt(blog_post_content, topic, keywords, task):
+    return f"""
+        You are a multi-disciplinary AI assistant specializing in content marketing. Based on the following blog post, generate the requested asset.
+
+        **Blog Post Content:**
+        ---
+        {blog_post_content}
+        ---
+
+        **Main Topic:** "{topic}"
+        **Keywords:** "{keywords}"
+
+        **Task:**
+        {task}
+    """
+
+
+def generate_seo_analysis(blog_post_content, topic, keywords):
+    """Returns {"meta_description", "keyword_analysis", "title_suggestion"}."""
+    task = """
+        Return a JSON object with exactly these keys:
+        - "meta_description": a compelling, SEO-optimized meta description (155-160 characters).
+        - "keyword_analysis": a brief markdown analysis of how well the main keywords were integrated.
+        - "title_suggestion": one alternative, catchy title for A/B testing.
+    """
+    return generate_json(
+        build_asset_prompt(blog_post_content, topic, keywords, task),
+        ["meta_description", "keyword_analysis", "title_suggestion"],
+    )
+
+
+def generate_social_posts(blog_post_content, topic, keywords):
+    """Returns {"twitter", "linkedin", "facebook"}."""
+    task = """
+        Return a JSON object with exactly these keys:
+        - "twitter": a short, punchy Twitter/X post with relevant hashtags.
+        - "linkedin": a more professional LinkedIn post, suitable for a business audience, encouraging discussion.
+        - "facebook": an engaging Facebook post that asks a question to drive comments.
+    """
+    return generate_json(
+        build_asset_prompt(blog_post_content, topic, keywords, task),
+        ["twitter", "linkedin", "facebook"],
+    )
+
+
+def generate_image_prompt(blog_post_content, topic, keywords):
+    """Returns {"idea", "prompt"}."""
+    task = """
+        Return a JSON object with exactly these keys:
+        - "idea": one or two sentences describing the featured image concept.
+        - "prompt": a descriptive prompt for an AI image generator (like Midjourney or DALL-E) to create a high-quality featured image for this blog. Be specific about style, composition, colors, and mood.
+    """
+    return generate_json(
+        build_asset_prompt(blog_post_content, topic, keywords, task),
+        ["idea", "prompt"],
+    )
+
+
+ACCOMPANYING_JOBS = {
+    "seo": generate_seo_analysis,
+    "social": generate_social_posts,
+    "image": generate_image_prompt,
+}
+
+
+def iter_accompanying_content(blog_post_content, topic, keywords):
+    """
+    Runs the SEO, social and image-prompt requests concurrently and yields
+    (name, result) pairs in the order they finish. A result is the parsed dict,
+    or an "Error ..." string for that job alone.
+    """
+    with ThreadPoolExecutor(max_workers=len(ACCOMPANYING_JOBS)) as executor:
+        futures = {
+            executor.submit(propagate(job), blog_post_content, topic, keywords): name
+            for name, job in ACCOMPANYING_JOBS.items()
+        }
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as e:
+                yield futures[future], f"Error from Gemini API: {str(e)}"
+
+
+def generate_accompanying_content(blog_post_content, topic, keywords):
+    """Generates SEO analysis, social posts, and an image prompt based on the blog."""
+    return dict(iter_accompanying_content(blog_post_content, topic, keywords))
+
+
+# --- Long-Form Engine (outline first, then sections in parallel) ---
+
+MAX_SECTIONS = 8  # sections per outline, not counting the introduction
+# Enough for every part of the longest outline at once (MAX_SECTIONS plus the introduction)
+SECTION_WORKERS = int(os.getenv("SECTION_WORKERS", str(MAX_SECTIONS + 1)))
+
+
+def build_style_brief(topic, keywords, tone, audience):
+    """The constraints every section prompt shares, so the stitched post reads as one voice."""
+    return f"""
+        **Primary Topic:** "{topic}"
+        **Keywords to strategically integrate:** "{keywords}"
+        **Target Audience:** "{audience}"
+        **Tone of Voice:** "{tone}"
+    """
+
+
+def generate_outline(topic, keywords, length, tone, audience, cta):
+    """
+    Asks for the skeleton of the post: one H1 title plus the H2 sections.
+    Returns {"title": str, "sections": [{"heading": str, "brief": str}, ...]}.
+    """
+    section_count = max(3, min(MAX_SECTIONS, length // 250))
+    prompt = f"""
+        You are a world-class blog writer and content strategist. Plan the outline of a blog post of about {length} words.
+        {build_style_brief(topic, keywords, tone, audience)}
+        **Call to Action:** The final section must lead naturally into this call to action: "{cta}"
+
+        Return a JSON object with exactly these keys:
+        - "title": one catchy, SEO-friendly H1 title (plain text, no # characters).
+        - "sections": a list of {section_count} objects, each with "heading" (an H2 heading, plain text) and "brief" (one sentence on what the section covers).
+        The last section must be the conclusion.
+    """
+    outline = generate_json(prompt, ["title", "sections"])
+    # A verbose reply must not turn into more requests (and threads) than were asked for
+    outline["sections"] = outline["sections"][:section_count]
+    return outline
+
+
+def generate_section(outline, index, topic, keywords, words, tone, audience, cta):
+    """
+    Writes one part of the post. Index -1 is the introduction; the last section
+    is the conclusion and carries the call to action.
+    """
+    sections = outline["sections"]
+    outline_str = "\n".join(f"## {s['heading']}" for s in sections)
+    if index == -1:
+        task = (
+            "Write ONLY the introduction: a short, compelling opening that hooks the reader and states the post's purpose. "
+            "Do not add any heading."
+        )
+    else:
+        section = sections[index]
+        task = (
+            f"Write ONLY the section \"{section['heading']}\" ({section.get('brief', '')}). "
+            f"Start with the line `## {section['heading']}` and use H3 subheadings (###), lists, bold text and italics where they help. "
+            "Do not repeat material that belongs to the other sections."
+        )
+        if index == len(sections) - 1:
+            task += f" This is the conclusion: summarize the key points and seamlessly integrate this call to action: \"{cta}\"."
+    prompt = f"""
+        You are a world-class blog writer, content strategist, and SEO expert, writing one part of a larger blog post.
+        {build_style_brief(topic, keywords, tone, audience)}
+        **Post Title:** "{outline['title']}"
+        **Full Outline:**
+        {outline_str}
+
+        **Your Task:** {task}
+        **Target Length:** Approximately {words} words.
+
+        **Output Format:** Return ONLY the raw markdown for this part. Do not include any of your own commentary.
+    """
+    return generate_text(prompt).strip()
+
+
+def generate_long_form_blog(topic, keywords, length, tone, audience, cta, max_workers=SECTION_WORKERS, on_progress=None):
+    """
+    Generates a long post as an outline followed by concurrent section requests,
+    so wall-clock time tracks the slowest section rather than the whole post.
+    `on_progress(done, total)` is called from the caller's thread as sections land.
+    """
+    try:
+        outline = generate_outline(topic, keywords, length, tone, audience, cta)
+        parts = [-1] + list(range(len(outline["sections"])))
+        words = max(100, length // len(parts))
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(parts)))) as executor:
+            futures = {
+                executor.submit(propagate(generate_section), outline, index, topic, keywords, words, tone, audience, cta): index
+                for index in parts
+            }
+            try:
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+                    if on_progress:
+                        on_progress(len(results), len(parts))
+            except BaseException:
+                # Failed or cancelled: don't start sections nobody will read
+                executor.shutdown(cancel_futures=True)
+                raise
+        body = "\n\n".join(results[index] for index in parts)
+        return f"# {outline['title']}\n\n{body}"
+    except JobCancelled:
+        raise
+    except Exception as e:
+        return f"Error from Gemini API: {str(e)}"
+
+
+# --- Background Job (submitted by the Blog page through utils.jobs) ---
+
+def run_blog_suite(job, topic, keywords, length, tone, audience, cta, long_form=False, stream=True):
+    """
+    Writes the post, then the SEO, social and image assets, publishing
+    {"post", "post_done", "assets"} as it goes so the page can show the post while it is
+    written and fill each tab as its asset lands. Returns the same dict when finished.
+    """
+    suite = {"post": "", "post_done": False, "assets": {}}
+    if long_form:
+        job.report(0, 1, "Planning the outline...")
+        suite["post"] = generate_long_form_blog(
+            topic, keywords, length, tone, audience, cta,
+            on_progress=lambda done, total: job.report(done, total, f"Writing sections... {done}/{total} done")
+        )
+    elif stream:
+        job.report(0, 1, "Writing your blog post...")
+        parts = []
+        try:
+            for chunk in stream_blog_content(topic, keywords, length, tone, audience, cta):
+                parts.append(chunk)
+                job.publish(dict(suite, post="".join(parts)))
+        except JobCancelled:
+            raise
+        except Exception as e:
+            parts = [f"Error from Gemini API: {str(e)}"]
+        suite["post"] = "".join(parts)
+    else:
+        job.report(0, 1, "Your AI is crafting the blog post... This may take a moment.")
+        suite["post"] = generate_blog_content(topic, keywords, length, tone, audience, cta)
+    suite["post_done"] = True
+    job.publish(dict(suite))
+    # Accompanying content is only generated if the blog post was successful
+    if not suite["post"] or "Error" in suite["post"]:
+        return suite
+
+    job.report(0, len(ACCOMPANYING_JOBS), "Your AI is crafting the rest of the content suite...")
+    for name, result in iter_accompanying_content(suite["post"], topic, keywords):
+        suite["assets"][name] = result
+        job.publish(dict(suite, assets=dict(suite["assets"])))
+        job.report(len(suite["assets"]), len(ACCOMPANYING_JOBS), "Your AI is crafting the rest of the content suite...")
+    return suite
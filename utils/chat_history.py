@@ -0,0 +1,82 @@
+# utils/chat_history.py
+import os
+
+from utils.gemini_client import generate_text
+from utils.summarizer import estimate_tokens
+
+# --- History Settings (override through .env) ---
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "3"))           # question/answer pairs kept verbatim
+REQUEST_TOKEN_BUDGET = int(os.getenv("REQUEST_TOKEN_BUDGET", "8000"))    # whole Q&A prompt, estimated
+SUMMARY_TOKEN_LIMIT = 400                                                  # cap on the running summary
+
+
+def format_messages(messages):
+    """Compact 'User: ... / Assistant: ...' transcript, much cheaper than indented JSON."""
+    return "\n".join(f"{message['role'].capitalize()}: {message['content']}" for message in messages)
+
+
+class ChatHistoryManager:
+    """
+    Keeps the last few turns of a chat verbatim and folds everything older into a
+    running summary. The summary is updated incrementally: each fold only sends the
+    previous summary plus the newly retired messages, never the whole conversation.
+    Lives in st.session_state, one per document chat.
+    """
+
+    def __init__(self, keep_turns=HISTORY_KEEP_TURNS):
+        self.keep_turns = keep_turns
+        self.summary = ""
+        self.folded = 0  # how many leading messages the summary already covers
+
+    def _fold(self, messages, upto):
+        """Merges messages[self.folded:upto] into the running summary."""
+        retired = messages[self.folded:upto]
+        if not retired:
+            return
+        prompt = f"""
+        You maintain a running summary of a conversation about a document.
+        Update the summary with the new messages below. Keep facts, names, numbers and open questions
+        the user may refer back to. Stay under {SUMMARY_TOKEN_LIMIT * 3 // 4} words. Return ONLY the updated summary.
+
+        **CURRENT SUMMARY:**
+        {self.summary or "(empty)"}
+
+        **NEW MESSAGES:**
+        {format_messages(retired)}
+        """
+        try:
+            self.summary = generate_text(prompt).strip()
+        except Exception as e:
+            # Losing detail beats blowing the budget: the retired turns are dropped
+            print(f"Could not update the chat summary: {e}")
+        self.folded = upto
+
+    def build(self, messages, token_budget):
+        """
+        Returns the history text for the next prompt, within `token_budget` estimated tokens.
+        `messages` is the conversation so far, *excluding* the question being asked.
+        """
+        cutoff = max(self.folded, len(messages) - self.keep_turns * 2)
+        self._fold(messages, cutoff)
+        # Retire further turns while the verbatim tail does not fit next to the summary
+        while cutoff < len(messages):
+            recent = format_messages(messages[cutoff:])
+            if estimate_tokens(self.summary) + estimate_tokens(recent) <= token_budget:
+                break
+            cutoff = min(len(messages), cutoff + 2)
+            self._fold(messages, cutoff)
+
+        parts = []
+        if self.summary:
+            summary = self.summary
+            if estimate_tokens(summary) > token_budget:
+                summary = summary[:max(0, token_budget) * 4]
+            parts.append(f"Summary of earlier conversation: {summary}")
+        if cutoff < len(messages):
+            parts.append(format_messages(messages[cutoff:]))
+        return "\n\n".join(parts) or "(no previous messages)"
+
+
+def history_budget(*prompt_parts):
+    """Tokens left for history once the rest of the prompt is accounted for."""
+    return max(0, REQUEST_TOKEN_BUDGET - sum(estimate_tokens(part) for part in prompt_parts))
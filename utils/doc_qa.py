@@ -0,0 +1,53 @@
+# utils/doc_qa.py
+from utils.chat_history import history_budget
+from utils.gemini_client import generate_text, stream_text
+from utils.retrieval import TOP_K
+
+QA_INSTRUCTIONS = """
+    You are a helpful AI assistant specialized in analyzing documents.
+    Your task is to answer the user's question based *only* on the provided document excerpts.
+    Each excerpt is labelled with the page, slide or paragraph it came from; cite those labels in your answer.
+    Consider the previous conversation for context. If the answer is not in the excerpts, state that clearly.
+"""
+
+
+def build_qa_prompt(document_index, chat_memory, chat_history, user_question):
+    """
+    `chat_history` is the conversation before `user_question`; `chat_memory` is the
+    ChatHistoryManager that keeps it inside the per-request token budget.
+    """
+    # Retrieve only the chunks relevant to this question (plus the previous one, for follow-ups)
+    previous_questions = [m["content"] for m in chat_history if m["role"] == "user"]
+    query = " ".join(previous_questions[-1:] + [user_question])
+    excerpts = "\n\n".join(f"[{chunk['source']}]\n{chunk['text']}" for chunk in document_index.search(query, TOP_K))
+
+    history_str = chat_memory.build(chat_history, history_budget(QA_INSTRUCTIONS, excerpts, user_question))
+
+    return f"""{QA_INSTRUCTIONS}
+    **DOCUMENT EXCERPTS:**
+    ---
+    {excerpts}
+    ---
+
+    **CONVERSATION HISTORY:**
+    ---
+    {history_str}
+    ---
+    
+    **USER'S LATEST QUESTION:**
+    {user_question}
+    """
+
+
+def get_answer_from_gemini(document_index, chat_memory, chat_history, user_question):
+    try:
+        prompt = build_qa_prompt(document_index, chat_memory, chat_history, user_question)
+        return generate_text(prompt)
+    except Exception as e:
+        return f"An error occurred with the Gemini API: {e}"
+
+
+def stream_answer_from_gemini(document_index, chat_memory, chat_history, user_question):
+    """Yields the answer chunk by chunk as Gemini streams it back."""
+    prompt = build_qa_prompt(document_index, chat_memory, chat_history, user_question)
+    yield from stream_text(prompt)
@@ -0,0 +1,147 @@
+# utils/doc_store.py
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+from utils.extraction import extract_records_from_file, records_to_text
+from utils.response_cache import CACHE_DIR
+from utils.retrieval import BM25Index, chunk_records
+
+# --- Document Store Settings (override through .env) ---
+DOC_CACHE_DIR = os.path.join(CACHE_DIR, "documents")
+DOC_CACHE_MAX_BYTES = int(os.getenv("DOC_CACHE_MAX_BYTES", str(500 * 1024 * 1024)))
+DOC_CACHE_MEMORY_ITEMS = int(os.getenv("DOC_CACHE_MEMORY_ITEMS", "8"))
+
+
+def file_digest(data):
+    """Content hash of the uploaded bytes; two uploads share work only if their bytes match."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class DocumentStore:
+    """
+    Bounded store for extracted documents and the indexes built from them.
+    Entries are pickled to one file each, so every worker process can reuse them;
+    the least recently used files are deleted once the directory exceeds its byte budget.
+    A small in-memory LRU avoids unpickling the documents this process is busy with.
+    """
+
+    def __init__(self, directory=DOC_CACHE_DIR, max_bytes=DOC_CACHE_MAX_BYTES, memory_items=DOC_CACHE_MEMORY_ITEMS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)  # mark as recently used for eviction
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Document store read failed for {key}: {e}")
+            return None
+        self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        self._remember(key, value)
+        tmp_path = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Write to a temp file and rename, so readers in other processes never see half a file
+            with tempfile.NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False) as tmp:
+                tmp_path = tmp.name
+                pickle.dump(value, tmp, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+            tmp_path = None
+            self._evict()
+        except Exception as e:
+            print(f"Document store write failed for {key}: {e}")
+        finally:
+            # A failed write leaves no .tmp behind; eviction only ever sees .pkl entries
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pkl"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+# --- Process-wide Instance ---
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_document_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = DocumentStore()
+    return _store
+
+
+def load_document(uploaded_file, page_range=None):
+    """
+    Returns {"key", "records", "text"} for an upload, extracting it only if these exact
+    bytes (and page range) have not been seen before. Returns an error string on failure.
+    """
+    key = file_digest(uploaded_file.getvalue())
+    if page_range:
+        key += f"-p{page_range[0]}-{page_range[1]}"
+    store = get_document_store()
+    document = store.get(key)
+    if document is None:
+        records = extract_records_from_file(uploaded_file, page_range)
+        if isinstance(records, str):
+            return records  # errors are not cached
+        document = {"key": key, "records": records, "text": records_to_text(records)}
+        store.put(key, document)
+    return document
+
+
+def load_document_index(document):
+    """Returns the BM25 index for a loaded document, building and storing it on first use."""
+    store = get_document_store()
+    index_key = f"{document['key']}-bm25"
+    index = store.get(index_key)
+    if index is None:
+        index = BM25Index(chunk_records(document["records"]))
+        store.put(index_key, index)
+    return index
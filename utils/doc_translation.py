@@ -0,0 +1,259 @@
+# utils/doc_translation.py
+import io
+import os
+
+from utils.extraction import iter_records
+from utils.language_id import resolve_source_language
+from utils.metrics import record_payload, track
+from utils.translation import BATCH_MAX_CHARS, TRANSLATION_WORKERS, translate_segments
+
+# Like utils/extraction.py, the parsers are imported inside the functions that need them.
+
+# --- Document Translation Settings (override through .env) ---
+# Source characters handed to translate_segments at once: enough to keep every worker busy,
+# small enough that a document with thousands of paragraphs never has them all in flight.
+DOC_TRANSLATION_WINDOW_CHARS = int(
+    os.getenv("DOC_TRANSLATION_WINDOW_CHARS", str(BATCH_MAX_CHARS * TRANSLATION_WORKERS * 2))
+)
+
+DOCUMENT_EXTENSIONS = (".docx", ".pptx", ".pdf")
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+PPTX_MIME = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+
+def _is_translatable(text):
+    return any(c.isalpha() for c in text)
+
+
+class _TextUnit:
+    """
+    One run of text to translate: a DOCX paragraph, or the part of a PPTX paragraph between
+    two line breaks. The translation goes into the first run, so the paragraph keeps its style
+    and the first run's character formatting; the other runs are emptied, not removed.
+    """
+
+    def __init__(self, runs):
+        self.runs = runs
+        self.text = "".join(run.text for run in runs)
+
+    def write(self, translation):
+        self.runs[0].text = translation
+        for run in self.runs[1:]:
+            run.text = ""
+
+
+# --- Walking the Documents ---
+def _docx_paragraph_units(paragraph):
+    from docx.text.run import Run
+    runs = []
+    for item in paragraph.iter_inner_content():  # runs, and the runs inside hyperlinks
+        runs.extend([item] if isinstance(item, Run) else item.runs)
+    if runs:
+        yield _TextUnit(runs)
+
+
+def _docx_block_units(container, seen_cells):
+    from docx.table import Table
+    for block in container.iter_inner_content():
+        if isinstance(block, Table):
+            for row in block.rows:
+                for cell in row.cells:
+                    if id(cell._tc) in seen_cells:  # merged cells repeat the same cell
+                        continue
+                    seen_cells.add(id(cell._tc))
+                    yield from _docx_block_units(cell, seen_cells)
+        else:
+            yield from _docx_paragraph_units(block)
+
+
+def _iter_docx_units(doc):
+    seen_cells = set()
+    yield from _docx_block_units(doc, seen_cells)
+    for section in doc.sections:
+        for part in (section.header, section.footer):
+            if not part.is_linked_to_previous:
+                yield from _docx_block_units(part, seen_cells)
+
+
+def _pptx_text_frame_units(text_frame):
+    from pptx.oxml.ns import qn
+    for paragraph in text_frame.paragraphs:
+        runs_by_element = {run._r: run for run in paragraph.runs}
+        group = []
+        for child in paragraph._p.iterchildren():
+            if child.tag == qn("a:br"):
+                if group:
+                    yield _TextUnit(group)
+                group = []
+            elif child in runs_by_element:
+                group.append(runs_by_element[child])
+        if group:
+            yield _TextUnit(group)
+
+
+def _pptx_shape_units(shapes):
+    from pptx.shapes.group import GroupShape
+    for shape in shapes:
+        # Not shape.shape_type: python-pptx raises NotImplementedError for shapes it does not
+        # recognize (some graphic frames, OLE objects), which would abort the whole deck
+        if isinstance(shape, GroupShape):
+            yield from _pptx_shape_units(shape.shapes)
+        elif getattr(shape, "has_table", False):
+            for row in shape.table.rows:
+                for cell in row.cells:
+                    yield from _pptx_text_frame_units(cell.text_frame)
+        elif getattr(shape, "has_text_frame", False):
+            yield from _pptx_text_frame_units(shape.text_frame)
+
+
+def _iter_pptx_units(pres):
+    for slide in pres.slides:
+        yield from _pptx_shape_units(slide.shapes)
+        if slide.has_notes_slide:
+            yield from _pptx_text_frame_units(slide.notes_slide.notes_text_frame)
+
+
+# --- Windowed Translation ---
+def _windows(units, max_chars=DOC_TRANSLATION_WINDOW_CHARS):
+    """Groups translatable units into windows of roughly `max_chars` source characters."""
+    window, size = [], 0
+    for unit in units:
+        if not _is_translatable(unit.text):
+            continue
+        if window and size + len(unit.text) > max_chars:
+            yield window
+            window, size = [], 0
+        window.append(unit)
+        size += len(unit.text)
+    if window:
+        yield window
+
+
+def _translate_units(units, total, source_lang, target_lang, on_progress):
+    """Translates units window by window and writes each translation back in place."""
+    done = reused = 0
+    for window in _windows(units):
+        texts = [unit.text for unit in window]
+        # Auto-Detect is resolved per window, so mixed-language documents still get a concrete source
+        window_lang = resolve_source_language(" ".join(texts), source_lang)[0]
+        # Reverse rows only for a language the user picked, never for a per-window guess
+        translations, window_reused = translate_segments(texts, window_lang, target_lang,
+                                                         remember_reverse=source_lang != "Auto-Detect")
+        for unit, translation in zip(window, translations):
+            unit.write(translation)
+        done += len(window)
+        reused += window_reused
+        if on_progress:
+            on_progress(done, total)
+    return done, reused
+
+
+def _translate_docx(data, source_lang, target_lang, on_progress):
+    from docx import Document
+    with track("extract_docx"):
+        doc = Document(io.BytesIO(data))
+        total = sum(1 for unit in _iter_docx_units(doc) if _is_translatable(unit.text))
+        record_payload(sent=len(data))
+    done, reused = _translate_units(_iter_docx_units(doc), total, source_lang, target_lang, on_progress)
+    out = io.BytesIO()
+    doc.save(out)
+    return out.getvalue(), ".docx", DOCX_MIME, done, reused
+
+
+def _translate_pptx(data, source_lang, target_lang, on_progress):
+    from pptx import Presentation
+    with track("extract_pptx"):
+        pres = Presentation(io.BytesIO(data))
+        total = sum(1 for unit in _iter_pptx_units(pres) if _is_translatable(unit.text))
+        record_payload(sent=len(data))
+    done, reused = _translate_units(_iter_pptx_units(pres), total, source_lang, target_lang, on_progress)
+    out = io.BytesIO()
+    pres.save(out)
+    return out.getvalue(), ".pptx", PPTX_MIME, done, reused
+
+
+def _translate_pdf(data, source_lang, target_lang, on_progress):
+    """
+    PDFs cannot be rewritten in place, so the translation comes back as a DOCX with one
+    heading per page. Pages are read lazily and translated one window of pages at a time.
+    """
+    from docx import Document
+    from pypdf import PdfReader
+    total = len(PdfReader(io.BytesIO(data)).pages)
+    doc = Document()
+    done = reused = translated_count = 0
+    pending, size = [], 0
+
+    def flush():
+        nonlocal done, reused, translated_count, pending, size
+        # A whole page is one unit: PDF text comes out as visual lines, which translate badly alone
+        units = [text.strip() for _, text in pending if _is_translatable(text)]
+        window_lang = resolve_source_language(" ".join(units), source_lang)[0]
+        translations, window_reused = translate_segments(
+            units, window_lang, target_lang, remember_reverse=source_lang != "Auto-Detect"
+        ) if units else ([], 0)
+        translated = iter(translations)
+        for number, text in pending:
+            doc.add_heading(f"Page {number}", level=2)
+            if _is_translatable(text):
+                doc.add_paragraph(next(translated))
+        done += len(pending)
+        reused += window_reused
+        translated_count += len(units)
+        pending, size = [], 0
+        if on_progress:
+            on_progress(done, total)
+
+    for _, number, text in iter_records("document.pdf", data):
+        pending.append((number, text))
+        size += len(text)
+        if size >= DOC_TRANSLATION_WINDOW_CHARS:
+            flush()
+    if pending:
+        flush()
+    out = io.BytesIO()
+    doc.save(out)
+    return out.getvalue(), ".docx", DOCX_MIME, translated_count, reused
+
+
+DOCUMENT_TRANSLATORS = {
+    ".docx": _translate_docx,
+    ".pptx": _translate_pptx,
+    ".pdf": _translate_pdf,
+}
+
+
+def translate_document(file_name, data, source_lang, target_lang, on_progress=None):
+    """
+    Translates a DOCX, PPTX or PDF while keeping its structure: paragraphs, tables, headers,
+    slide shapes and notes are translated in place, in windows of batched parallel requests
+    that go through the translation memory. `on_progress(done, total)` is called after each
+    window (units are paragraphs, or pages for PDFs).
+    Returns {"data", "file_name", "mime", "units", "reused"}, or an error string on failure.
+    """
+    stem, extension = os.path.splitext(file_name)
+    translator = DOCUMENT_TRANSLATORS.get(extension.lower())
+    if translator is None:
+        return f"Error: Unsupported file type '{extension}'. Please upload a DOCX, PPTX or PDF file."
+    try:
+        output, out_extension, mime, units, reused = translator(data, source_lang, target_lang, on_progress)
+    except Exception as e:
+        return f"An error occurred during translation: {e}"
+    if not units:
+        return "Error: No translatable text was found in the document. It might be empty or scanned."
+    return {
+        "data": output,
+        "file_name": f"{stem}_{target_lang}{out_extension}",
+        "mime": mime,
+        "units": units,
+        "reused": reused,
+    }
+
+
+def translate_document_job(job, file_name, data, source_lang, target_lang):
+    """translate_document as a background job (see utils.jobs); progress goes to the job."""
+    job.report(0, 1, "Reading document...")
+    return translate_document(
+        file_name, data, source_lang, target_lang,
+        on_progress=lambda done, total: job.report(done, total, f"Translated {done} of {total}")
+    )
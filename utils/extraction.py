@@ -0,0 +1,162 @@
+# utils/extraction.py
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from utils.metrics import record_payload, track
+
+# The parsers (pypdf, python-docx, python-pptx) are imported inside the functions that
+# need them, so spawned PDF workers and pages that never extract anything stay light.
+
+# --- Extraction Settings (override through .env) ---
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "64"))  # below this, parse in-process
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(max(1, min(8, os.cpu_count() or 1)))))
+PDF_TASKS_PER_WORKER = 4  # smaller batches keep records flowing back in order
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".pptx", ".txt")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """One process pool per server process, created on the first large PDF."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # "spawn" avoids forking a process that is running Streamlit's threads
+                _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _discard_pool(pool):
+    """Drops a broken pool (a worker died: OOM, parser crash) so the next large PDF starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _extract_pdf_pages(path, start, stop):
+    """Worker task: returns [(page_number, text)] for pages start..stop-1 (0-based)."""
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    return [(i + 1, reader.pages[i].extract_text() or "") for i in range(start, stop)]
+
+
+def _clamp_range(page_range, total):
+    """Turns a 1-based inclusive (first, last) into 0-based [start, stop)."""
+    if not page_range:
+        return 0, total
+    first, last = page_range
+    start = max(0, (first or 1) - 1)
+    stop = min(total, last or total)
+    return start, max(start, stop)
+
+
+def _iter_pdf(data, page_range):
+    from pypdf import PdfReader
+    reader = PdfReader(io.BytesIO(data))
+    start, stop = _clamp_range(page_range, len(reader.pages))
+    if stop - start < PDF_PARALLEL_MIN_PAGES or PDF_WORKERS < 2:
+        for i in range(start, stop):
+            yield "Page", i + 1, reader.pages[i].extract_text() or ""
+        return
+
+    # Large file: workers open their own reader from a temp file instead of receiving the bytes
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(data)
+        path = tmp.name
+    try:
+        batch = max(1, -(-(stop - start) // (PDF_WORKERS * PDF_TASKS_PER_WORKER)))
+        bounds = [(b, min(b + batch, stop)) for b in range(start, stop, batch)]
+        pool = _get_pool()
+        next_page = start
+        try:
+            futures = [pool.submit(_extract_pdf_pages, path, b_start, b_stop) for b_start, b_stop in bounds]
+            for future in futures:  # submission order == page order
+                for number, text in future.result():
+                    yield "Page", number, text
+                    next_page = number
+        except BrokenProcessPool:
+            # Finish this file in-process from where the workers stopped
+            _discard_pool(pool)
+            for i in range(next_page, stop):
+                yield "Page", i + 1, reader.pages[i].extract_text() or ""
+    finally:
+        os.unlink(path)
+
+
+def _iter_docx(data):
+    from docx import Document
+    doc = Document(io.BytesIO(data))
+    for number, para in enumerate(doc.paragraphs, start=1):
+        yield "Paragraph", number, para.text
+
+
+def _iter_pptx(data, page_range):
+    from pptx import Presentation
+    pres = Presentation(io.BytesIO(data))
+    start, stop = _clamp_range(page_range, len(pres.slides))
+    for number, slide in enumerate(pres.slides, start=1):
+        if start < number <= stop:
+            yield "Slide", number, "\n".join(shape.text for shape in slide.shapes if hasattr(shape, "text"))
+
+
+def _iter_txt(data):
+    text = data.decode("utf-8")
+    for number, para in enumerate(text.split("\n\n"), start=1):
+        yield "Paragraph", number, para
+
+
+def iter_records(file_name, data, page_range=None):
+    """
+    Yields (kind, number, text) records such as ("Page", 3, "...") for PDF, DOCX, PPTX and TXT.
+    `page_range` is an optional 1-based inclusive (first, last) applied to PDF pages and PPTX slides.
+    """
+    file_extension = os.path.splitext(file_name)[1].lower()
+    if file_extension == ".pdf":
+        yield from _iter_pdf(data, page_range)
+    elif file_extension == ".docx":
+        yield from _iter_docx(data)
+    elif file_extension == ".pptx":
+        yield from _iter_pptx(data, page_range)
+    elif file_extension == ".txt":
+        yield from _iter_txt(data)
+
+
+def extract_records_from_file(uploaded_file, page_range=None):
+    """
+    Extracts text from PDF, DOCX, PPTX, and TXT files as (kind, number, text) records,
+    e.g. ("Page", 3, "..."), so answers can point back to where they came from.
+    Returns an error string on failure.
+    """
+    try:
+        data = uploaded_file.getvalue()
+        extension = os.path.splitext(uploaded_file.name)[1].lower().lstrip(".") or "file"
+        with track(f"extract_{extension}"):
+            records = list(iter_records(uploaded_file.name, data, page_range))
+            record_payload(sent=len(data), received=sum(len(text.encode("utf-8")) for _, _, text in records))
+        if not any(text.strip() for _, _, text in records):
+            return "Error: No text could be extracted from the document. It might be empty or scanned."
+        return records
+    except Exception as e:
+        return f"Error reading file: {e}"
+
+
+def records_to_text(records):
+    return "\n".join(text for _, _, text in records)
+
+
+def extract_text_from_file(uploaded_file, page_range=None):
+    """Extracts text from PDF, DOCX, PPTX, and TXT files."""
+    records = extract_records_from_file(uploaded_file, page_range)
+    if isinstance(records, str):
+        return records
+    return records_to_text(records)
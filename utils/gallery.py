@@ -0,0 +1,76 @@
+# utils/gallery.py
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.image_cache import fetch_photo_bytes
+from utils.metrics import propagate
+from utils.pexels import search_photos
+
+# --- Gallery Settings (override through .env) ---
+THUMBNAIL_VARIANT = "tiny"      # Pexels' 280x200 rendition
+GALLERY_COLUMNS = 5
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "8"))
+PREFETCH_WORKERS = 2            # next pages being warmed at once, across all sessions
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(name, max_workers):
+    """
+    Process-wide thread pools. Page prefetches wait on thumbnail downloads, so the two
+    get separate pools; sharing one could fill it with prefetches waiting on each other.
+    """
+    if name not in _pools:
+        with _pools_lock:
+            if name not in _pools:
+                _pools[name] = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"gallery-{name}")
+    return _pools[name]
+
+
+def _thumbnail_or_none(photo):
+    try:
+        return fetch_photo_bytes(photo, THUMBNAIL_VARIANT)
+    except Exception as e:
+        print(f"Could not fetch thumbnail for photo {photo.get('id')}: {e}")
+        return None
+
+
+def fetch_thumbnails(photos):
+    """Downloads the thumbnails of a page concurrently; returns bytes (or None on failure) per photo."""
+    return list(_get_pool("thumbnails", THUMBNAIL_WORKERS).map(propagate(_thumbnail_or_none), photos))
+
+
+def _prefetch_page(keywords, orientation, size, page):
+    result = search_photos(keywords, orientation, size, page)
+    if isinstance(result, dict):
+        fetch_thumbnails(result["photos"])
+
+
+def prefetch_page(keywords, orientation, size, page):
+    """
+    Warms the search cache and the image cache for a page the user has not opened yet.
+    Returns immediately; if the user gets there first, the single-flight guards in the
+    search and image paths make them share the same requests.
+    """
+    _get_pool("pages", PREFETCH_WORKERS).submit(propagate(_prefetch_page), keywords, orientation, size, page)
+
+
+def load_gallery_page(keywords, orientation, size, page=1, prefetched=None):
+    """
+    One gallery page: the search results plus their thumbnails, and the next page already
+    on its way in the background. `prefetched` is a set of (keywords, orientation, size, page)
+    the caller keeps across reruns, so each next page is only submitted once. Returns the
+    search_photos dict with a "thumbnails" list added, or an error string.
+    """
+    result = search_photos(keywords, orientation, size, page)
+    if isinstance(result, str):
+        return result
+    result["thumbnails"] = fetch_thumbnails(result["photos"])
+    next_page = (keywords, orientation, size, page + 1)
+    if result["has_next"] and (prefetched is None or next_page not in prefetched):
+        prefetch_page(*next_page)
+        if prefetched is not None:
+            prefetched.add(next_page)
+    return result
@@ -0,0 +1,120 @@
+# utils/gemini_client.py
+import os
+import threading
+
+from dotenv import load_dotenv
+
+from utils.metrics import record_usage, track
+from utils.rate_limit import call_upstream
+from utils.response_cache import cached_generate_content, cached_stream_content, make_cache_key
+from utils.single_flight import SingleFlight
+
+# --- Client Settings (override through .env) ---
+# Every page and helper goes through this module, so these are the only knobs to tune.
+load_dotenv()
+MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+REQUEST_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "120"))  # seconds per request
+REQUEST_OPTIONS = {"timeout": REQUEST_TIMEOUT}
+GENERATION_CONFIG = {
+    key: cast(os.getenv(env))
+    for key, env, cast in (
+        ("temperature", "GEMINI_TEMPERATURE", float),
+        ("max_output_tokens", "GEMINI_MAX_OUTPUT_TOKENS", int),
+    )
+    if os.getenv(env)
+}
+
+_genai = None
+_genai_lock = threading.Lock()
+_models = {}
+_models_lock = threading.Lock()
+_flights = SingleFlight("gemini")
+
+
+def is_configured():
+    """
+    Reports whether a Gemini API key was found. Pages call this on every rerun to decide
+    what to render, so it does not import the SDK; that happens on the first request.
+    """
+    return bool(os.getenv("GEMINI_API_KEY"))
+
+
+def get_genai():
+    """
+    Imports and configures google.generativeai the first time a model is needed. The SDK
+    takes most of a second to import, which no longer delays the first render of any page.
+    """
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                import google.generativeai as genai
+                api_key = os.getenv("GEMINI_API_KEY")
+                if api_key:
+                    genai.configure(api_key=api_key)
+                _genai = genai
+    return _genai
+
+
+class GuardedModel:
+    """
+    Wraps a GenerativeModel so every request that actually reaches Gemini is coalesced
+    with identical in-flight requests and goes through the shared rate limiter, retry
+    policy and circuit breaker. Cache hits never get here.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.model_name = model.model_name
+
+    def generate_content(self, prompt, generation_config=None, request_options=None, stream=False):
+        def call():
+            response = call_upstream("gemini", lambda: self.model.generate_content(
+                prompt, generation_config=generation_config, request_options=request_options, stream=stream
+            ))
+            if not stream:
+                # Counted once, by the caller that sent the request; a stream reports usage when it ends
+                record_usage(getattr(response, "usage_metadata", None))
+            return response
+        # Identical prompts already in flight (e.g. many users on one trending topic) share one request;
+        # a caller joining a stream replays the chunks read so far, then follows the live ones
+        key = make_cache_key(self.model_name, prompt, generation_config)
+        if stream:
+            return _flights.stream(key, call)
+        return _flights.do(key, call)
+
+
+def get_model(name=MODEL_NAME):
+    """Returns the shared model handle for `name`; handles (and their transport) are reused across calls."""
+    model = _models.get(name)
+    if model is None:
+        genai = get_genai()
+        with _models_lock:
+            model = _models.get(name)
+            if model is None:
+                model = GuardedModel(genai.GenerativeModel(name))
+                _models[name] = model
+    return model
+
+
+def _merge_config(generation_config):
+    if not generation_config:
+        return dict(GENERATION_CONFIG) or None
+    return {**GENERATION_CONFIG, **generation_config}
+
+
+def generate_text(prompt, generation_config=None, model_name=MODEL_NAME, validate=None):
+    """
+    Returns the response text for `prompt`, through the shared response cache.
+    `validate(text)` should raise for an unusable reply, which is then never cached.
+    """
+    with track("gemini"):
+        return cached_generate_content(
+            get_model(model_name), prompt, _merge_config(generation_config), REQUEST_OPTIONS, validate=validate
+        )
+
+
+def stream_text(prompt, generation_config=None, model_name=MODEL_NAME):
+    """Yields the response text for `prompt` chunk by chunk, through the shared response cache."""
+    with track("gemini"):
+        yield from cached_stream_content(get_model(model_name), prompt, _merge_config(generation_config), REQUEST_OPTIONS)
@@ -0,0 +1,149 @@
+# utils/image_cache.py
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from utils.metrics import record_cache, record_payload, track
+from utils.pexels import REQUEST_TIMEOUT, get_session
+from utils.response_cache import CACHE_DIR
+from utils.single_flight import SingleFlight
+
+# --- Image Cache Settings (override through .env) ---
+IMAGE_CACHE_DIR = os.path.join(CACHE_DIR, "images")
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(500 * 1024 * 1024)))
+IMAGE_CACHE_MEMORY_BYTES = int(os.getenv("IMAGE_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+
+
+def image_key(photo_id, variant):
+    """Cache key for one rendition of a photo, e.g. "2014422-large2x"."""
+    return f"{photo_id}-{variant}"
+
+
+class ImageCache:
+    """
+    Size-bounded byte cache for downloaded images.
+    A memory LRU capped in bytes sits in front of one file per image on disk, shared by every
+    worker process; the least recently used files are deleted once the directory exceeds its budget.
+    """
+
+    def __init__(self, directory=IMAGE_CACHE_DIR, max_bytes=IMAGE_CACHE_MAX_BYTES, memory_bytes=IMAGE_CACHE_MEMORY_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.bin")
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # mark as recently used for eviction
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            print(f"Image cache read failed for {key}: {e}")
+            return None
+        self._remember(key, data)
+        return data
+
+    def put(self, key, data):
+        self._remember(key, data)
+        tmp_path = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Write to a temp file and rename, so readers in other processes never see half an image
+            with tempfile.NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False) as tmp:
+                tmp_path = tmp.name
+                tmp.write(data)
+            os.replace(tmp_path, self._path(key))
+            tmp_path = None
+            self._evict()
+        except OSError as e:
+            print(f"Image cache write failed for {key}: {e}")
+        finally:
+            # A failed write (e.g. a full disk) leaves no .tmp behind
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def _remember(self, key, data):
+        if len(data) > self.memory_bytes:
+            return  # too big for the memory tier; the disk tier still has it
+        with self._lock:
+            if key in self._memory:
+                self._memory_size -= len(self._memory.pop(key))
+            self._memory[key] = data
+            self._memory_size += len(data)
+            while self._memory_size > self.memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= len(evicted)
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".bin"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+# --- Process-wide Instance ---
+_cache = None
+_cache_lock = threading.Lock()
+_flights = SingleFlight("image_download")
+
+
+def get_image_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ImageCache()
+    return _cache
+
+
+def _download(url):
+    response = get_session().get(url, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    record_payload(received=len(response.content))
+    return response.content
+
+
+def fetch_photo_bytes(photo, variant="large2x"):
+    """
+    Returns the bytes of one rendition of a Pexels photo (a key of photo["src"]).
+    Each rendition is downloaded once and then served from the cache; concurrent
+    requests for the same rendition share a single download. Raises on failure.
+    """
+    cache = get_image_cache()
+    key = image_key(photo["id"], variant)
+    with track("pexels_image"):
+        data = cache.get(key)
+        record_cache(data is not None)
+        if data is None:
+            def download():
+                data = _download(photo["src"][variant])
+                cache.put(key, data)
+                return data
+            data = _flights.do(key, download)
+    return data
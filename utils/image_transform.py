@@ -0,0 +1,98 @@
+# utils/image_transform.py
+import io
+
+from utils.image_cache import fetch_photo_bytes, get_image_cache, image_key
+from utils.single_flight import SingleFlight
+
+# Pillow is imported inside the functions that need it, like the document parsers.
+
+# --- Output Presets ---
+SIZE_PRESETS = {
+    "landscape": {
+        "Blog header (1600×900)": (1600, 900),
+        "Blog inline (1200×675)": (1200, 675),
+        "Facebook / LinkedIn link (1200×630)": (1200, 630),
+        "YouTube thumbnail (1280×720)": (1280, 720),
+    },
+    "portrait": {
+        "Instagram portrait (1080×1350)": (1080, 1350),
+        "Pinterest pin (1000×1500)": (1000, 1500),
+        "Story / Reel (1080×1920)": (1080, 1920),
+    },
+    "square": {
+        "Instagram square (1080×1080)": (1080, 1080),
+        "Blog thumbnail (600×600)": (600, 600),
+    },
+}
+QUALITY_LEVELS = {"High": 90, "Balanced": 80, "Small": 65}
+OUTPUT_FORMATS = {
+    "WebP": {"extension": "webp", "mime": "image/webp"},
+    "JPEG (progressive)": {"extension": "jpg", "mime": "image/jpeg"},
+}
+
+# Pexels' large2x rendition fits the original into this box; anything bigger comes from the original
+LARGE2X_BOX = (1880, 1300)
+
+_flights = SingleFlight("image_transform")
+
+
+def make_spec(width, height, output_format="WebP", quality="Balanced"):
+    return {"width": width, "height": height, "format": output_format, "quality": QUALITY_LEVELS[quality]}
+
+
+def spec_key(spec):
+    """Stable cache-key suffix for a transform spec, e.g. "1600x900-webp-q80"."""
+    extension = OUTPUT_FORMATS[spec["format"]]["extension"]
+    return f"{spec['width']}x{spec['height']}-{extension}-q{spec['quality']}"
+
+
+def source_variant(photo, width, height):
+    """The smallest Pexels rendition that still covers a width x height crop: large2x, else original."""
+    original_w, original_h = photo.get("width") or 0, photo.get("height") or 0
+    if not original_w or not original_h:
+        return "original"
+    scale = min(LARGE2X_BOX[0] / original_w, LARGE2X_BOX[1] / original_h, 1.0)
+    large_w, large_h = original_w * scale, original_h * scale
+    # Center crop to the target aspect ratio, then check the crop is at least the target size
+    crop_scale = min(large_w / width, large_h / height)
+    return "large2x" if crop_scale >= 1.0 else "original"
+
+
+def transform_image(data, spec):
+    """Center-crops `data` to the spec's aspect ratio, resizes it and encodes it. Returns bytes."""
+    from PIL import Image, ImageOps
+    size = (spec["width"], spec["height"])
+    with Image.open(io.BytesIO(data)) as image:
+        # Let the JPEG decoder downscale while decoding when the source is much larger than needed
+        image.draft("RGB", size)
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        image = ImageOps.fit(image, size, method=Image.Resampling.LANCZOS)
+    out = io.BytesIO()
+    if spec["format"] == "WebP":
+        image.save(out, "WEBP", quality=spec["quality"], method=4)
+    else:
+        image.save(out, "JPEG", quality=spec["quality"], optimize=True, progressive=True)
+    return out.getvalue()
+
+
+def transform_photo(photo, spec):
+    """
+    Returns the blog-ready bytes of a Pexels photo for a transform spec. The source rendition
+    is fetched through the image cache and each (photo id, spec) output is cached next to it,
+    so a transform runs once however often it is downloaded. Raises on failure.
+    """
+    cache = get_image_cache()
+    key = image_key(photo["id"], spec_key(spec))
+    data = cache.get(key)
+    if data is None:
+        def run():
+            source = fetch_photo_bytes(photo, source_variant(photo, spec["width"], spec["height"]))
+            output = transform_image(source, spec)
+            cache.put(key, output)
+            return output
+        data = _flights.do(key, run)
+    return data
+
+
+def output_file_name(photo, spec):
+    return f"pexels_{photo['id']}_{spec['width']}x{spec['height']}.{OUTPUT_FORMATS[spec['format']]['extension']}"
@@ -0,0 +1,216 @@
+# utils/jobs.py
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.metrics import propagate, register_collector
+
+# --- Job Settings (override through .env) ---
+# Long work (blog suites, summaries, document and multi-language translations) runs here
+# instead of inside the Streamlit script, so a widget interaction no longer interrupts it
+# and a slow request no longer holds a script thread. Pages keep only the job id and poll.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "8"))
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", "3600"))  # finished jobs kept this long
+JOB_MAX_RETAINED = int(os.getenv("JOB_MAX_RETAINED", "500"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "0.5"))  # how often pages refresh a running job
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's function at its next progress report once the job was cancelled."""
+
+
+class Job:
+    """
+    One unit of background work. The job's function receives it as its first argument and
+    reports through it: report() for progress, publish() for partial results such as a
+    post that is still being written. Both raise JobCancelled once a cancel was requested,
+    so existing on_progress callbacks double as cancellation points.
+    """
+
+    def __init__(self, label):
+        self.id = uuid.uuid4().hex
+        self.label = label
+        self.status = "queued"
+        self.progress = 0.0
+        self.message = ""
+        self.partial = None
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check(self):
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+
+    def report(self, done, total, message=None):
+        """Progress as done/total (the signature of the helpers' on_progress callbacks)."""
+        self.check()
+        with self._lock:
+            self.progress = min(1.0, done / total) if total else 0.0
+            if message is not None:
+                self.message = message
+
+    def publish(self, partial):
+        """Makes a partial result visible to the page while the job keeps running."""
+        self.check()
+        with self._lock:
+            self.partial = partial
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "id": self.id,
+                "label": self.label,
+                "status": self.status,
+                "progress": self.progress,
+                "message": self.message,
+                "partial": self.partial,
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+            }
+
+    def _finish(self, status, result=None, error=None):
+        with self._lock:
+            self.status = status
+            self.result = result
+            self.error = error
+            self.finished_at = time.time()
+            if status == "done":
+                self.progress = 1.0
+
+
+class JobExecutor:
+    """
+    Process-wide pool for background jobs. Every session submits here, so JOB_WORKERS caps
+    how much long work runs at once; later jobs queue. Finished jobs keep their result for
+    JOB_RETENTION_SECONDS, so a page that reruns or reconnects can still collect it.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, retention_seconds=JOB_RETENTION_SECONDS,
+                 max_retained=JOB_MAX_RETAINED):
+        self.retention_seconds = retention_seconds
+        self.max_retained = max_retained
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()  # id -> (Job, Future)
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, label="", **kwargs):
+        """Queues fn(job, *args, **kwargs) and returns the job id."""
+        job = Job(label or getattr(fn, "__name__", "job"))
+        # Calls the job makes keep this page's metrics labels
+        future = self._pool.submit(propagate(self._run), job, fn, args, kwargs)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = (job, future)
+        return job.id
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancelled:
+            job._finish("cancelled")
+            return
+        with job._lock:
+            job.status = "running"
+        try:
+            result = fn(job, *args, **kwargs)
+        except JobCancelled:
+            job._finish("cancelled")
+        except Exception as e:
+            # Helpers that fold errors into strings may swallow JobCancelled; the flag still wins
+            job._finish("cancelled" if job.cancelled else "failed", error=str(e))
+        else:
+            job._finish("cancelled" if job.cancelled else "done", result=result)
+
+    def get(self, job_id):
+        """Returns a snapshot dict of the job, or None if the id is unknown or has expired."""
+        with self._lock:
+            entry = self._jobs.get(job_id)
+        return entry[0].snapshot() if entry else None
+
+    def cancel(self, job_id):
+        """Asks a job to stop: a queued job never starts, a running one stops at its next report."""
+        with self._lock:
+            entry = self._jobs.get(job_id)
+        if entry is None:
+            return False
+        job, future = entry
+        job._cancel.set()
+        if future.cancel():  # still queued: it will never run
+            job._finish("cancelled")
+        return True
+
+    def _prune(self):
+        """Drops finished jobs past their retention, then the oldest finished ones over the cap."""
+        now = time.time()
+        finished = [(job_id, job) for job_id, (job, _) in self._jobs.items() if job.finished_at is not None]
+        for job_id, job in finished:
+            if now - job.finished_at > self.retention_seconds:
+                del self._jobs[job_id]
+        excess = len(self._jobs) - self.max_retained
+        for job_id, job in finished:
+            if excess <= 0:
+                break
+            if job_id in self._jobs:
+                del self._jobs[job_id]
+                excess -= 1
+
+    def stats(self):
+        with self._lock:
+            statuses = [job.status for job, _ in self._jobs.values()]
+        return {status: statuses.count(status) for status in ("queued", "running", "done", "failed", "cancelled")}
+
+
+# --- Process-wide Instance ---
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_job_executor():
+    """Returns the executor shared by every session in this process."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = JobExecutor()
+    return _executor
+
+
+def submit_job(fn, *args, label="", **kwargs):
+    return get_job_executor().submit(fn, *args, label=label, **kwargs)
+
+
+def get_job(job_id):
+    return get_job_executor().get(job_id) if job_id else None
+
+
+def cancel_job(job_id):
+    return get_job_executor().cancel(job_id) if job_id else False
+
+
+def is_active(job):
+    """True for a snapshot of a job that is still queued or running."""
+    return bool(job) and job["status"] in ACTIVE_STATUSES
+
+
+def _collect_jobs():
+    """Retained jobs by status as a gauge at /metrics; empty until the first job is submitted."""
+    if _executor is None:
+        return []
+    return [("app_jobs", "gauge", "Background jobs held by the executor, by status.",
+             [({"status": status}, count) for status, count in _executor.stats().items()])]
+
+
+register_collector(_collect_jobs)
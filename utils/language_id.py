@@ -0,0 +1,240 @@
+# utils/language_id.py
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+# --- Language ID Settings (override through .env) ---
+# Below this confidence the Translator leaves "Auto-Detect" to the model.
+LANGUAGE_ID_MIN_CONFIDENCE = float(os.getenv("LANGUAGE_ID_MIN_CONFIDENCE", "0.8"))
+MIN_LETTERS = 12          # shorter texts in a shared script get a proportionally lower confidence
+MAX_SAMPLE_CHARS = 4000   # detection only looks at the start of long texts
+NGRAM_SIZES = (1, 2, 3)
+# Overlapping n-grams are far from independent, so raw naive-Bayes posteriors are
+# overconfident on short phrases; scores are divided by this before normalising.
+SCORE_TEMPERATURE = 6.0
+
+# Scripts that identify a language on their own (Unicode block ranges)
+SCRIPT_RANGES = {
+    "Tamil": [(0x0B80, 0x0BFF)],
+    "Devanagari": [(0x0900, 0x097F)],
+    "Arabic": [(0x0600, 0x06FF), (0x0750, 0x077F), (0xFB50, 0xFDFF), (0xFE70, 0xFEFF)],
+    "Hangul": [(0x1100, 0x11FF), (0x3130, 0x318F), (0xAC00, 0xD7AF)],
+    "Kana": [(0x3040, 0x30FF), (0x31F0, 0x31FF)],
+    "Han": [(0x3400, 0x4DBF), (0x4E00, 0x9FFF), (0xF900, 0xFAFF)],
+}
+SCRIPT_LANGUAGES = {
+    "Tamil": "Tamil",
+    "Devanagari": "Hindi",
+    "Arabic": "Arabic",
+    "Hangul": "Korean",
+    "Kana": "Japanese",
+    "Han": "Chinese (Simplified)",
+}
+KANA_SHARE_FOR_JAPANESE = 0.1  # Japanese text mixes kana into Han; Chinese has none
+# Scripts written by several languages, where a few letters are weak evidence; Tamil,
+# Devanagari and Hangul text is identified by its script however short it is
+SHARED_SCRIPTS = ("Latin", "Arabic", "Han", "Kana")
+
+# Latin-script languages are told apart by character n-grams learned from these samples.
+LATIN_SAMPLES = {
+    "English": """
+        The quick brown fox jumps over the lazy dog. This is the first time that we have seen
+        anything like it, and we should think about what it means for the people who live here.
+        Please let me know whether you would like to join us for dinner on Thursday evening.
+        Our team is working hard to make sure that every customer gets the help they need.
+        It was the best of times, it was the worst of times, and nobody knew which way things would go.
+        I have been thinking about your question and I believe the answer is simpler than it looks.
+        The weather should be nicer this weekend, so we might go for a walk through the park.
+        """,
+    "Spanish": """
+        El rápido zorro marrón salta sobre el perro perezoso. Es la primera vez que vemos algo así,
+        y deberíamos pensar en lo que significa para las personas que viven aquí.
+        Por favor, dime si te gustaría cenar con nosotros el jueves por la noche.
+        Nuestro equipo trabaja mucho para que cada cliente reciba la ayuda que necesita.
+        ¿Dónde está la estación de tren? Me gustaría saber cuánto cuesta el billete para mañana.
+        He estado pensando en tu pregunta y creo que la respuesta es más sencilla de lo que parece.
+        El tiempo será mejor este fin de semana, así que quizás demos un paseo por el parque.
+        """,
+    "French": """
+        Le renard brun rapide saute par-dessus le chien paresseux. C'est la première fois que nous
+        voyons une chose pareille, et nous devrions réfléchir à ce que cela signifie pour les gens d'ici.
+        Dites-moi, s'il vous plaît, si vous voulez dîner avec nous jeudi soir.
+        Notre équipe travaille dur pour que chaque client reçoive l'aide dont il a besoin.
+        Où est la gare ? J'aimerais savoir combien coûte le billet pour demain matin.
+        J'ai réfléchi à votre question et je crois que la réponse est plus simple qu'elle n'en a l'air.
+        Il fera plus beau ce week-end, alors nous irons peut-être nous promener dans le parc.
+        """,
+    "German": """
+        Der schnelle braune Fuchs springt über den faulen Hund. Es ist das erste Mal, dass wir so
+        etwas sehen, und wir sollten darüber nachdenken, was es für die Menschen hier bedeutet.
+        Bitte sag mir, ob du am Donnerstagabend mit uns zu Abend essen möchtest.
+        Unser Team arbeitet hart daran, dass jeder Kunde die Hilfe bekommt, die er braucht.
+        Wo ist der Bahnhof? Ich möchte wissen, wie viel die Fahrkarte für morgen früh kostet.
+        Ich habe über deine Frage nachgedacht und glaube, die Antwort ist einfacher, als sie aussieht.
+        Das Wetter soll am Wochenende schöner werden, also gehen wir vielleicht im Park spazieren.
+        """,
+}
+
+# Latin-script languages the app does not offer. They are never returned; they give the model
+# somewhere else to put its probability, so Italian text no longer reads as confident Spanish
+# and Dutch as confident German, and such texts are left to Gemini instead.
+BACKGROUND_SAMPLES = {
+    "Italian": """
+        La veloce volpe marrone salta sopra il cane pigro. È la prima volta che vediamo una cosa del
+        genere, e dovremmo pensare a cosa significa per le persone che vivono qui.
+        Per favore, fammi sapere se vuoi cenare con noi giovedì sera.
+        Il nostro gruppo lavora sodo perché ogni cliente riceva l'aiuto di cui ha bisogno.
+        Dov'è la stazione? Vorrei sapere quanto costa il biglietto per domani mattina.
+        Ho pensato alla tua domanda e credo che la risposta sia più semplice di quanto sembri.
+        Il tempo sarà migliore questo fine settimana, quindi forse faremo una passeggiata nel parco.
+        """,
+    "Portuguese": """
+        A rápida raposa marrom pula sobre o cão preguiçoso. É a primeira vez que vemos algo assim,
+        e devíamos pensar no que isso significa para as pessoas que vivem aqui.
+        Por favor, diga-me se você gostaria de jantar conosco na quinta-feira à noite.
+        A nossa equipe trabalha muito para que cada cliente receba a ajuda de que precisa.
+        Onde fica a estação de trem? Eu gostaria de saber quanto custa a passagem para amanhã de manhã.
+        Estive pensando na sua pergunta e acho que a resposta é mais simples do que parece.
+        O tempo vai melhorar neste fim de semana, então talvez a gente faça um passeio pelo parque.
+        """,
+    "Dutch": """
+        De snelle bruine vos springt over de luie hond. Het is de eerste keer dat we zoiets zien,
+        en we moeten nadenken over wat het betekent voor de mensen die hier wonen.
+        Laat me alsjeblieft weten of je donderdagavond met ons wilt komen eten.
+        Ons team werkt hard om ervoor te zorgen dat elke klant de hulp krijgt die hij nodig heeft.
+        Waar is het station? Ik wil graag weten hoeveel het kaartje voor morgenochtend kost.
+        Ik heb over je vraag nagedacht en ik denk dat het antwoord eenvoudiger is dan het lijkt.
+        Het weer wordt dit weekend beter, dus misschien gaan we een wandeling maken in het park.
+        """,
+    "Swedish": """
+        Den snabba bruna räven hoppar över den lata hunden. Det är första gången vi ser något sådant,
+        och vi borde tänka på vad det betyder för människorna som bor här.
+        Säg till om du vill äta middag med oss på torsdag kväll.
+        Vårt team arbetar hårt för att varje kund ska få den hjälp de behöver.
+        Var ligger järnvägsstationen? Jag skulle vilja veta hur mycket biljetten kostar i morgon bitti.
+        Jag har funderat på din fråga och tror att svaret är enklare än det ser ut.
+        Vädret blir bättre i helgen, så vi kanske tar en promenad i parken.
+        """,
+    "Polish": """
+        Szybki brązowy lis przeskakuje nad leniwym psem. To pierwszy raz, kiedy widzimy coś takiego,
+        i powinniśmy zastanowić się, co to znaczy dla ludzi, którzy tu mieszkają.
+        Daj mi znać, czy chciałbyś zjeść z nami kolację w czwartek wieczorem.
+        Nasz zespół ciężko pracuje, aby każdy klient otrzymał pomoc, której potrzebuje.
+        Gdzie jest dworzec? Chciałbym wiedzieć, ile kosztuje bilet na jutro rano.
+        Zastanawiałem się nad twoim pytaniem i myślę, że odpowiedź jest prostsza, niż się wydaje.
+        Pogoda ma być lepsza w ten weekend, więc może pójdziemy na spacer do parku.
+        """,
+    "Indonesian": """
+        Rubah cokelat yang cepat melompati anjing yang malas. Ini pertama kalinya kami melihat hal
+        seperti itu, dan kita harus memikirkan apa artinya bagi orang-orang yang tinggal di sini.
+        Tolong beri tahu saya apakah kamu ingin makan malam bersama kami pada hari Kamis.
+        Tim kami bekerja keras untuk memastikan setiap pelanggan mendapatkan bantuan yang mereka butuhkan.
+        Di mana stasiun kereta? Saya ingin tahu berapa harga tiket untuk besok pagi.
+        Saya sudah memikirkan pertanyaanmu dan saya rasa jawabannya lebih sederhana dari kelihatannya.
+        Cuaca akan lebih baik akhir pekan ini, jadi mungkin kami akan berjalan-jalan di taman.
+        """,
+}
+
+SUPPORTED_LANGUAGES = tuple(LATIN_SAMPLES) + tuple(dict.fromkeys(SCRIPT_LANGUAGES.values()))
+
+_NON_LETTERS = re.compile(r"[\W\d_]+")
+
+
+def _script_of(char):
+    code = ord(char)
+    for script, ranges in SCRIPT_RANGES.items():
+        if any(low <= code <= high for low, high in ranges):
+            return script
+    return "Latin" if char.isalpha() else None
+
+
+def _ngrams(text):
+    """Character n-grams of each word, padded with spaces so word starts and ends count."""
+    for word in _NON_LETTERS.split(text.lower()):
+        if not word:
+            continue
+        padded = f" {word} "
+        for n in NGRAM_SIZES:
+            for i in range(len(padded) - n + 1):
+                gram = padded[i:i + n]
+                if gram != " ":
+                    yield gram
+
+
+# --- Latin-script Model (naive Bayes over character n-grams) ---
+class NgramModel:
+    def __init__(self, samples):
+        self.counts = {lang: Counter(_ngrams(text)) for lang, text in samples.items()}
+        self.totals = {lang: sum(counts.values()) for lang, counts in self.counts.items()}
+        self.vocabulary = len(set().union(*self.counts.values()))
+
+    def probabilities(self, text):
+        """Returns {language: probability} from add-one smoothed n-gram likelihoods."""
+        grams = Counter(_ngrams(text))
+        scores = {}
+        for lang, counts in self.counts.items():
+            denominator = self.totals[lang] + self.vocabulary
+            log_likelihood = sum(n * math.log((counts.get(gram, 0) + 1) / denominator) for gram, n in grams.items())
+            scores[lang] = log_likelihood / SCORE_TEMPERATURE
+        best = max(scores.values())
+        weights = {lang: math.exp(score - best) for lang, score in scores.items()}
+        total = sum(weights.values())
+        return {lang: weight / total for lang, weight in weights.items()}
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_ngram_model():
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = NgramModel({**LATIN_SAMPLES, **BACKGROUND_SAMPLES})
+    return _model
+
+
+def detect_language(text):
+    """
+    Identifies the language of `text` offline. Returns (language, confidence) with a
+    confidence between 0 and 1, or (None, 0.0) when there are no letters to go on.
+    The script decides Tamil, Hindi, Arabic, Korean, Japanese and Chinese; character
+    n-grams decide between the Latin-script languages. Only scripts shared by several
+    languages lose confidence on very short texts, and Latin text that looks more like a
+    BACKGROUND_SAMPLES language than a supported one comes back with a low confidence.
+    """
+    sample = text[:MAX_SAMPLE_CHARS]
+    scripts = Counter(script for script in map(_script_of, sample) if script)
+    letters = sum(scripts.values())
+    if not letters:
+        return None, 0.0
+    script, count = scripts.most_common(1)[0]
+    length_factor = min(1.0, letters / MIN_LETTERS) if script in SHARED_SCRIPTS else 1.0
+    if script in ("Han", "Kana"):
+        cjk = scripts["Han"] + scripts["Kana"]
+        language = "Japanese" if scripts["Kana"] >= KANA_SHARE_FOR_JAPANESE * cjk else "Chinese (Simplified)"
+        return language, cjk / letters * length_factor
+    if script != "Latin":
+        return SCRIPT_LANGUAGES[script], count / letters * length_factor
+
+    probabilities = get_ngram_model().probabilities(sample)
+    # The background languages keep their share of the probability but are never the answer
+    language = max(LATIN_SAMPLES, key=probabilities.get)
+    return language, probabilities[language] * count / letters * length_factor
+
+
+def resolve_source_language(text, source_lang, min_confidence=LANGUAGE_ID_MIN_CONFIDENCE):
+    """
+    Replaces "Auto-Detect" with the detected language when detection is confident enough.
+    Returns (source_lang_to_use, detected_language, confidence); the first item stays
+    "Auto-Detect" when the model should be left to work it out.
+    """
+    if source_lang != "Auto-Detect":
+        return source_lang, None, 0.0
+    language, confidence = detect_language(text)
+    if language is not None and confidence >= min_confidence:
+        return language, language, confidence
+    return source_lang, language, confidence
@@ -0,0 +1,348 @@
+# utils/metrics.py
+import os
+import sys
+import threading
+import time
+
+# --- Metrics Settings (override through .env) ---
+# Every Gemini call, Pexels request and document extraction is recorded in this process,
+# labeled by page and by the app function that made it. METRICS_PORT serves the numbers
+# at /metrics in the Prometheus text format; METRICS_PANEL shows them in every page's sidebar.
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # 0 keeps the endpoint off
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PANEL = os.getenv("METRICS_PANEL", "").lower() in ("1", "true", "yes")
+DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)  # seconds
+
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Shared plumbing every call passes through; the function label is the app code above it
+_PLUMBING = {
+    os.path.join(_APP_ROOT, "utils", name)
+    for name in ("metrics.py", "gemini_client.py", "response_cache.py", "rate_limit.py", "single_flight.py")
+}
+
+_app_code = {}  # co_filename -> True for app code outside the plumbing
+_local = threading.local()  # page label, propagated function label and the call being tracked
+
+
+# --- Labels ---
+def set_page(name):
+    """Labels everything this script run does with the page `name`. Call it at the top of every page."""
+    _local.page = name
+    start_metrics_server()
+
+
+def _caller(site):
+    """Name of the first app function above the frame `site`, skipping plumbing and module-level code."""
+    frame = site.f_back
+    while frame is not None:
+        code = frame.f_code
+        app_code = _app_code.get(code.co_filename)
+        if app_code is None:
+            path = os.path.abspath(code.co_filename)
+            app_code = _app_code[code.co_filename] = path.startswith(_APP_ROOT) and path not in _PLUMBING
+        if app_code and not code.co_name.startswith("<"):
+            return code.co_name
+        frame = frame.f_back
+    return None
+
+
+def propagate(fn):
+    """
+    Wraps `fn` for a worker thread so the calls it makes keep the submitting thread's page
+    and function labels; otherwise work fanned out to a pool would be labeled "none".
+    """
+    site = sys._getframe(1)
+    page = getattr(_local, "page", None)
+    function = _caller(site) or getattr(_local, "function", None) or site.f_code.co_name
+
+    def run(*args, **kwargs):
+        previous = getattr(_local, "page", None), getattr(_local, "function", None)
+        _local.page, _local.function = page, function
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.page, _local.function = previous
+    return run
+
+
+# --- Calls ---
+class Call:
+    """One tracked call. Code further down the stack adds to it through the record_* helpers."""
+
+    def __init__(self, target, page, function):
+        self.target = target
+        self.page = page
+        self.function = function
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.sent = 0
+        self.received = 0
+        self.cache = None  # "hit", "miss" or None when there is no cache in front
+        self._start = None
+        self._previous = None
+
+    def __enter__(self):
+        self._previous = getattr(_local, "call", None)
+        _local.call = self
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if getattr(_local, "call", None) is self:  # a stream abandoned mid-way may be closed from another thread
+            _local.call = self._previous
+        # A stream the reader stopped consuming ends with GeneratorExit; that is not an upstream error
+        failed = exc_type is not None and not issubclass(exc_type, GeneratorExit)
+        get_registry().observe(self, time.perf_counter() - self._start, "error" if failed else "ok")
+        return False
+
+
+def track(target, function=None):
+    """
+    Context manager that records one call to `target` ("gemini", "pexels", "extract_pdf"...):
+    wall time, outcome, and whatever the code inside reports (retries, tokens, cache, bytes).
+    The function label defaults to the nearest app function above the tracking site, then to
+    the function that fanned the work out to this thread (see propagate), then to the site.
+    """
+    site = sys._getframe(1)
+    if function is None:
+        function = _caller(site) or getattr(_local, "function", None) or site.f_code.co_name
+    return Call(target, getattr(_local, "page", None) or "none", function)
+
+
+def _current():
+    return getattr(_local, "call", None)
+
+
+def record_retry():
+    call = _current()
+    if call is not None:
+        call.retries += 1
+
+
+def record_cache(hit):
+    call = _current()
+    if call is not None:
+        call.cache = "hit" if hit else "miss"
+
+
+def record_payload(sent=0, received=0):
+    call = _current()
+    if call is not None:
+        call.sent += sent
+        call.received += received
+
+
+def record_usage(usage):
+    """Adds a Gemini response's usage_metadata (prompt and output token counts) to the current call."""
+    call = _current()
+    if call is not None and usage is not None:
+        call.prompt_tokens += getattr(usage, "prompt_token_count", 0) or 0
+        call.output_tokens += getattr(usage, "candidates_token_count", 0) or 0
+
+
+# --- Registry ---
+class _Series:
+    def __init__(self):
+        self.outcomes = {"ok": 0, "error": 0}
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.cache = {"hit": 0, "miss": 0}
+        self.sent = 0
+        self.received = 0
+
+    def snapshot(self):
+        values = dict(vars(self))
+        values.update(outcomes=dict(self.outcomes), buckets=list(self.buckets), cache=dict(self.cache))
+        return values
+
+
+class MetricsRegistry:
+    """Per-process totals keyed by (target, page, function)."""
+
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, call, seconds, outcome):
+        key = (call.target, call.page, call.function)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series()
+            series.outcomes[outcome] += 1
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:  # Prometheus buckets are cumulative
+                    series.buckets[i] += 1
+            series.seconds += seconds
+            series.max_seconds = max(series.max_seconds, seconds)
+            series.retries += call.retries
+            series.prompt_tokens += call.prompt_tokens
+            series.output_tokens += call.output_tokens
+            if call.cache:
+                series.cache[call.cache] += 1
+            series.sent += call.sent
+            series.received += call.received
+
+    def rows(self):
+        """One dict per (target, page, function), slowest total time first, for the sidebar panel."""
+        with self._lock:
+            items = [(key, series.snapshot()) for key, series in self._series.items()]
+        rows = []
+        for (target, page, function), s in items:
+            calls = s["outcomes"]["ok"] + s["outcomes"]["error"]
+            looked_up = s["cache"]["hit"] + s["cache"]["miss"]
+            rows.append({
+                "page": page,
+                "function": function,
+                "target": target,
+                "calls": calls,
+                "errors": s["outcomes"]["error"],
+                "total_s": round(s["seconds"], 2),
+                "avg_ms": round(s["seconds"] / calls * 1000, 1),
+                "max_ms": round(s["max_seconds"] * 1000, 1),
+                "retries": s["retries"],
+                "prompt_tokens": s["prompt_tokens"],
+                "output_tokens": s["output_tokens"],
+                "cache_hit_rate": round(s["cache"]["hit"] / looked_up, 2) if looked_up else None,
+                "kb_sent": round(s["sent"] / 1024, 1),
+                "kb_received": round(s["received"] / 1024, 1),
+            })
+        rows.sort(key=lambda row: row["total_s"], reverse=True)
+        return rows
+
+    def prometheus_text(self):
+        """All series in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            items = sorted((key, series.snapshot()) for key, series in self._series.items())
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+
+        def labels(key, **extra):
+            pairs = list(zip(("target", "page", "function"), key)) + list(extra.items())
+            return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+        family("app_calls_total", "counter", "Upstream calls and document extractions by outcome.", [
+            f"app_calls_total{labels(key, outcome=outcome)} {count}"
+            for key, s in items for outcome, count in s["outcomes"].items()
+        ])
+        histogram = []
+        for key, s in items:
+            for bound, count in zip(DURATION_BUCKETS, s["buckets"]):  # already cumulative, see observe()
+                histogram.append(f"app_call_duration_seconds_bucket{labels(key, le=_format_bound(bound))} {count}")
+            total = s["outcomes"]["ok"] + s["outcomes"]["error"]
+            histogram.append(f"app_call_duration_seconds_bucket{labels(key, le='+Inf')} {total}")
+            histogram.append(f"app_call_duration_seconds_sum{labels(key)} {s['seconds']:.6f}")
+            histogram.append(f"app_call_duration_seconds_count{labels(key)} {total}")
+        family("app_call_duration_seconds", "histogram", "Wall time per call, including rate-limit waits and retries.",
+               histogram)
+        family("app_retries_total", "counter", "Retried upstream attempts.", [
+            f"app_retries_total{labels(key)} {s['retries']}" for key, s in items
+        ])
+        family("app_tokens_total", "counter", "Gemini tokens billed, from the responses' usage metadata.", [
+            f"app_tokens_total{labels(key, direction=direction)} {s[field]}"
+            for key, s in items if key[0] == "gemini"
+            for direction, field in (("prompt", "prompt_tokens"), ("output", "output_tokens"))
+        ])
+        family("app_cache_requests_total", "counter", "Cache lookups in front of the call.", [
+            f"app_cache_requests_total{labels(key, result=result)} {count}"
+            for key, s in items if s["cache"]["hit"] or s["cache"]["miss"]
+            for result, count in s["cache"].items()
+        ])
+        family("app_payload_bytes_total", "counter", "Bytes sent to the upstream (or parser) and received back.", [
+            f"app_payload_bytes_total{labels(key, direction=direction)} {s[direction]}"
+            for key, s in items for direction in ("sent", "received")
+        ])
+        for collect in list(_collectors):
+            try:
+                collected = collect()
+            except Exception:
+                continue  # a broken collector must not take the whole endpoint down
+            for name, kind, help_text, samples in collected:
+                family(name, kind, help_text, [f"{name}{_format_labels(extra)} {value}" for extra, value in samples])
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs.items()) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_bound(bound):
+    return f"{float(bound):g}"
+
+
+# --- Collectors (state other modules own, read at scrape time) ---
+_collectors = []
+
+
+def register_collector(collect):
+    """
+    Adds collect() to the /metrics output. It runs on every scrape and returns a list of
+    (name, kind, help, [(labels dict, value), ...]) families, so gauges show the current value.
+    """
+    if collect not in _collectors:
+        _collectors.append(collect)
+
+
+# --- Process-wide Instance ---
+_registry = MetricsRegistry()
+_server = None
+_server_lock = threading.Lock()
+
+
+def get_registry():
+    return _registry
+
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    """Serves GET /metrics on `port` from a background thread, once per process. Does nothing for port 0."""
+    global _server
+    if not port or _server is not None:
+        return
+    with _server_lock:
+        if _server is not None:
+            return
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = get_registry().prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        try:
+            _server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            # Another worker process on this machine already serves the port
+            print(f"Metrics endpoint not started on {host}:{port}: {e}")
+            _server = False
+            return
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+
+
+def metrics_rows():
+    return get_registry().rows()
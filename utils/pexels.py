@@ -0,0 +1,261 @@
+# utils/pexels.py
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+
+from dotenv import load_dotenv
+
+from utils.metrics import record_cache, record_payload, register_collector, track
+from utils.rate_limit import call_upstream
+from utils.single_flight import SingleFlight
+
+# --- Load the Pexels API Key ---
+load_dotenv()
+PEXELS_KEY = os.getenv("PEXELS_API_KEY")
+API_URL = "https://api.pexels.com/v1/search" # The official Pexels API endpoint
+REQUEST_TIMEOUT = 15  # seconds
+
+# --- Connection and Cache Settings (override through .env) ---
+PEXELS_POOL_SIZE = int(os.getenv("PEXELS_POOL_SIZE", "10"))                   # keep-alive connections per host
+SEARCH_CACHE_ITEMS = int(os.getenv("PEXELS_SEARCH_CACHE_ITEMS", "512"))
+SEARCH_CACHE_MAX_TTL = int(os.getenv("PEXELS_SEARCH_CACHE_TTL", "3600"))       # seconds, upper bound
+GALLERY_PER_PAGE = int(os.getenv("PEXELS_GALLERY_PER_PAGE", "15"))
+
+_flights = SingleFlight("pexels")
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """One keep-alive session per process, so searches and downloads reuse TCP/TLS connections."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                # requests is imported here rather than at module level to keep page startup light
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=PEXELS_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+# --- Rate-limit Headers (for monitoring) ---
+_quota = {}
+_quota_lock = threading.Lock()
+
+
+def _record_quota(response):
+    """Keeps the latest X-Ratelimit-* values Pexels sent back."""
+    headers = response.headers
+    if "X-Ratelimit-Remaining" not in headers:
+        return
+    fields = {"limit": "X-Ratelimit-Limit", "remaining": "X-Ratelimit-Remaining", "reset": "X-Ratelimit-Reset"}
+    try:
+        # "reset" is the Unix time the monthly quota starts over
+        values = {name: int(headers[header]) for name, header in fields.items() if header in headers}
+    except ValueError:
+        return
+    with _quota_lock:
+        _quota.update(values, updated=time.time())
+
+
+def get_rate_limit_status():
+    """Returns the last seen {"limit", "remaining", "reset", "updated"}, or {} before the first search."""
+    with _quota_lock:
+        return dict(_quota)
+
+
+def _collect_quota():
+    """The quota as gauges at /metrics; nothing is exported before the first search."""
+    quota = get_rate_limit_status()
+    gauges = [
+        ("app_pexels_quota_remaining", "Requests left in the Pexels monthly quota.", "remaining"),
+        ("app_pexels_quota_limit", "Size of the Pexels monthly quota.", "limit"),
+        ("app_pexels_quota_reset_timestamp_seconds", "Unix time the Pexels quota starts over.", "reset"),
+    ]
+    return [(name, "gauge", help_text, [({}, quota[field])]) for name, help_text, field in gauges if field in quota]
+
+
+register_collector(_collect_quota)
+
+
+# --- Search Cache (bounded, per process, TTL from the response's caching headers) ---
+def cache_ttl(response):
+    """
+    Seconds a search response may be reused for: Cache-Control max-age (or Expires),
+    capped at SEARCH_CACHE_MAX_TTL. Returns None for no-store (never kept) and 0 for
+    no-cache (kept only to revalidate with its ETag). Responses without caching headers get the cap.
+    """
+    cache_control = response.headers.get("Cache-Control", "").lower()
+    if "no-store" in cache_control:
+        return None
+    if "no-cache" in cache_control:
+        return 0
+    match = re.search(r"max-age=(\d+)", cache_control)
+    if match:
+        return min(int(match.group(1)), SEARCH_CACHE_MAX_TTL)
+    expires = response.headers.get("Expires")
+    if expires:
+        try:
+            return max(0, min(parsedate_to_datetime(expires).timestamp() - time.time(), SEARCH_CACHE_MAX_TTL))
+        except (TypeError, ValueError):
+            return 0
+    return SEARCH_CACHE_MAX_TTL
+
+
+class SearchCache:
+    """LRU of search results with a per-entry expiry; stale entries keep their ETag for revalidation."""
+
+    def __init__(self, max_items=SEARCH_CACHE_ITEMS):
+        self.max_items = max_items
+        self._entries = OrderedDict()  # key -> (expires_at, etag, data)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def fresh(self, key):
+        """Returns the cached data while it is fresh, otherwise None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+            return None
+
+    def stale(self, key):
+        """Returns (etag, data) of an entry regardless of its age, or (None, None)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return (entry[1], entry[2]) if entry else (None, None)
+
+    def set(self, key, data, ttl, etag=None):
+        if ttl is None or (ttl <= 0 and not etag):
+            return
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, etag, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+
+_search_cache = SearchCache()
+
+
+def _search(params, cache_key):
+    """Sends the search, revalidating a stale cached result with its ETag when there is one."""
+    etag, stale = _search_cache.stale(cache_key)
+    headers = {"Authorization": PEXELS_KEY}
+    if etag:
+        headers["If-None-Match"] = etag
+    response = get_session().get(API_URL, headers=headers, params=params, timeout=REQUEST_TIMEOUT)
+    record_payload(received=len(response.content))
+    _record_quota(response)
+    if response.status_code == 304 and stale is not None:
+        # Our stale copy is still current: serve it and start a new TTL
+        _search_cache.set(cache_key, stale, cache_ttl(response), etag)
+        return stale
+    response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
+    data = response.json()
+    _search_cache.set(cache_key, data, cache_ttl(response), response.headers.get("ETag"))
+    return data
+
+
+def format_pexels_status():
+    """One-line summary of the Pexels quota and the search cache for a sidebar caption."""
+    quota = get_rate_limit_status()
+    if "limit" in quota:
+        quota_text = f"{quota['remaining']:,} of {quota['limit']:,} requests left"
+    else:
+        quota_text = f"{quota['remaining']:,} requests left" if quota else "quota not seen yet"
+    return f"📷 Pexels: {quota_text} · search cache {_search_cache.hits} hits · {_search_cache.misses} misses"
+
+
+def _error_message(error):
+    from requests.exceptions import RequestException
+    if isinstance(error, RequestException):
+        return f"Error connecting to Pexels API: {error}"
+    return f"An unexpected error occurred: {error}"
+
+
+def _cached_search(params):
+    """
+    Returns the search response for `params`. Repeat searches are served from the cache;
+    fresh ones are rate-limited, retried on 429/5xx with backoff, and short-circuited while
+    Pexels is down. Identical searches already in flight wait for that request instead of sending their own.
+    """
+    flight_key = tuple(sorted(params.items()))
+    with track("pexels"):
+        data = _search_cache.fresh(flight_key)
+        record_cache(data is not None)
+        if data is None:
+            data = _flights.do(flight_key, lambda: call_upstream("pexels", lambda: _search(params, flight_key)))
+    return data
+
+
+# --- The function that uses the OFFICIAL Pexels API (Now with more options!) ---
+def get_image_from_pexels_api(keywords, orientation="landscape", size="large"):
+    """
+    This function uses the stable, official Pexels API to get a relevant image.
+    It now returns the full photo data dictionary or an error string.
+    """
+    if not PEXELS_KEY:
+        return "ERROR: Pexels API Key not found. Please check your .env file."
+
+    params = {
+        "query": keywords,
+        "per_page": 1,
+        "orientation": orientation,
+        "size": size,
+    }
+
+    try:
+        data = _cached_search(params)
+        if data["photos"]:
+            # Return the entire first photo object
+            return data["photos"][0]
+        else:
+            return "Error: No photos found for that query. Please try different keywords."
+
+    except Exception as e:
+        return _error_message(e)
+
+
+def search_photos(keywords, orientation="landscape", size="large", page=1, per_page=GALLERY_PER_PAGE):
+    """
+    Fetches one page of search results for the gallery: one API call per page.
+    Returns {"photos", "page", "total_results", "has_next"} or an error string.
+    """
+    if not PEXELS_KEY:
+        return "ERROR: Pexels API Key not found. Please check your .env file."
+
+    params = {
+        "query": keywords,
+        "per_page": per_page,
+        "page": page,
+        "orientation": orientation,
+        "size": size,
+    }
+
+    try:
+        data = _cached_search(params)
+        if not data["photos"]:
+            return "Error: No photos found for that query. Please try different keywords."
+        return {
+            "photos": data["photos"],
+            "page": page,
+            "total_results": data.get("total_results", len(data["photos"])),
+            "has_next": bool(data.get("next_page")),
+        }
+
+    except Exception as e:
+        return _error_message(e)
@@ -0,0 +1,199 @@
+# utils/rate_limit.py
+import os
+import random
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from utils.metrics import record_retry
+from utils.response_cache import CACHE_DIR
+
+# --- Limits per Upstream (override through .env) ---
+# Rates sit a little under the published quota so we queue briefly instead of collecting 429s.
+UPSTREAM_LIMITS = {
+    "gemini": {
+        "per_second": float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "300")) / 60,
+        "burst": float(os.getenv("GEMINI_BURST", "20")),
+    },
+    "pexels": {
+        "per_second": float(os.getenv("PEXELS_REQUESTS_PER_HOUR", "190")) / 3600,
+        "burst": float(os.getenv("PEXELS_BURST", "10")),
+    },
+}
+RATE_LIMIT_PATH = os.path.join(CACHE_DIR, "rate_limits.sqlite3")
+MAX_QUEUE_SECONDS = float(os.getenv("RATE_LIMIT_MAX_WAIT", "60"))
+
+RETRY_ATTEMPTS = int(os.getenv("UPSTREAM_RETRY_ATTEMPTS", "4"))
+RETRY_BASE_DELAY = 1.0   # seconds, doubled on every attempt
+RETRY_MAX_DELAY = 30.0
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+BREAKER_FAILURES = 5      # consecutive failures that open the circuit
+BREAKER_RESET_SECONDS = 30
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a request would have to queue longer than MAX_QUEUE_SECONDS."""
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the upstream while its circuit breaker is open."""
+
+
+# --- Token Bucket (shared by every worker process through SQLite) ---
+class TokenBucket:
+    def __init__(self, path=RATE_LIMIT_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def _take(self, name, per_second, burst):
+        """Takes one token if available; otherwise returns how long until one will be."""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")  # serializes the read-modify-write across processes
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * per_second)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / per_second
+            conn.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)", (name, tokens, now))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def acquire(self, name, per_second, burst, max_wait=MAX_QUEUE_SECONDS):
+        deadline = time.monotonic() + max_wait
+        while True:
+            try:
+                wait = self._take(name, per_second, burst)
+            except sqlite3.Error as e:
+                print(f"Rate limiter unavailable, letting the request through: {e}")
+                return
+            if wait == 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimitTimeout(f"{name} is busy right now. Please try again in a minute.")
+            time.sleep(wait)
+
+
+# --- Circuit Breaker (per upstream, per process) ---
+class CircuitBreaker:
+    def __init__(self, name, failures=BREAKER_FAILURES, reset_seconds=BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self._count = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_seconds:
+                raise CircuitOpenError(
+                    f"{self.name} is failing repeatedly; pausing requests for {self.reset_seconds}s."
+                )
+            # Half-open: let this request through as a probe
+
+    def record(self, ok):
+        with self._lock:
+            if ok:
+                self._count = 0
+                self._opened_at = None
+            else:
+                self._count += 1
+                if self._count >= self.failures:
+                    self._opened_at = time.monotonic()
+
+
+# --- Retry Helpers ---
+def error_status(error):
+    """HTTP-ish status code of a requests or google-api-core error, if there is one."""
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    if status is None:
+        code = getattr(error, "code", None)
+        status = code if isinstance(code, int) else None
+    return status
+
+
+def is_retryable(error):
+    status = error_status(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # No status: connection resets, timeouts and the like
+    return isinstance(error, (ConnectionError, TimeoutError)) or type(error).__name__ in (
+        "ConnectionError", "Timeout", "ReadTimeout", "ConnectTimeout", "DeadlineExceeded", "ServiceUnavailable",
+    )
+
+
+def retry_after_seconds(error):
+    """Reads a Retry-After header (seconds or HTTP date) off the error's response."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("Retry-After") if hasattr(headers, "get") else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def backoff_delay(attempt, error):
+    """Full-jitter exponential backoff, or the server's Retry-After when it sent one."""
+    retry_after = retry_after_seconds(error)
+    if retry_after is not None:
+        return min(retry_after, RETRY_MAX_DELAY)
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+# --- Process-wide Instances ---
+_bucket = TokenBucket()
+_breakers = {name: CircuitBreaker(name.capitalize()) for name in UPSTREAM_LIMITS}
+
+
+def call_upstream(upstream, fn, attempts=RETRY_ATTEMPTS):
+    """
+    Calls `fn()` for the named upstream ("gemini" or "pexels"): waits for a rate-limit
+    token, retries 429/5xx/connection errors with jittered backoff, and trips the
+    upstream's circuit breaker after repeated failures. Re-raises the last error.
+    """
+    limits = UPSTREAM_LIMITS[upstream]
+    breaker = _breakers[upstream]
+    for attempt in range(attempts):
+        breaker.before_call()
+        _bucket.acquire(upstream, limits["per_second"], limits["burst"])
+        try:
+            result = fn()
+        except Exception as e:
+            retryable = is_retryable(e)
+            breaker.record(ok=not retryable)
+            if not retryable or attempt == attempts - 1:
+                raise
+            record_retry()
+            time.sleep(backoff_delay(attempt, e))
+        else:
+            breaker.record(ok=True)
+            return result
@@ -0,0 +1,308 @@
+# utils/response_cache.py
+import hashlib
+import json
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from utils.metrics import record_cache, record_payload, record_usage
+
+# --- Cache Settings (override through .env) ---
+CACHE_DIR = os.getenv("APP_CACHE_DIR", ".cache")
+RESPONSE_CACHE_PATH = os.path.join(CACHE_DIR, "responses.sqlite3")
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+RESPONSE_CACHE_MEMORY_ITEMS = int(os.getenv("RESPONSE_CACHE_MEMORY_ITEMS", "256"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+# How many writes happen between two passes of the disk eviction sweep
+EVICTION_INTERVAL = 50
+# Hit/miss counts are kept in process and written to the shared stats table at most this often,
+# so a memory-tier hit never touches SQLite; the sidebar's row and byte totals are reused as long
+STATS_FLUSH_SECONDS = 10
+
+
+def make_cache_key(model_name, prompt, generation_config=None):
+    """Builds a stable hash from the model name, the prompt and the generation config."""
+    payload = json.dumps(
+        {"model": model_name, "prompt": prompt, "config": generation_config or {}},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier cache for model responses.
+    An in-memory LRU sits in front of a SQLite database in WAL mode, so every
+    Streamlit worker process on the machine reads and fills the same disk tier.
+    Entries expire after a TTL and the disk tier is trimmed to a byte budget.
+    """
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, ttl=RESPONSE_CACHE_TTL,
+                 memory_items=RESPONSE_CACHE_MEMORY_ITEMS, max_bytes=RESPONSE_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._local = threading.local()  # one SQLite connection per thread
+        self._writes = 0
+        self._pending = {"hits": 0, "misses": 0}  # counted here, not yet in the stats table
+        self._flushed_at = time.time()
+        self._totals = None  # (read_at, disk_entries, disk_bytes)
+
+    # --- Disk Tier ---
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                       key TEXT PRIMARY KEY,
+                       value TEXT NOT NULL,
+                       size INTEGER NOT NULL,
+                       expires_at REAL NOT NULL,
+                       last_access REAL NOT NULL
+                   )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)")
+            conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, count INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO stats VALUES ('hits', 0), ('misses', 0)")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name):
+        with self._lock:
+            self._pending[name] += 1
+            due = time.time() - self._flushed_at >= STATS_FLUSH_SECONDS
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """Adds this process's pending hit/miss counts to the stats table shared by all processes."""
+        with self._lock:
+            pending = self._pending
+            self._pending = {"hits": 0, "misses": 0}
+            self._flushed_at = time.time()
+        if not any(pending.values()):
+            return
+        try:
+            self._connect().executemany(
+                "UPDATE stats SET count = count + ? WHERE name = ?", [(n, name) for name, n in pending.items()]
+            )
+        except sqlite3.Error as e:
+            print(f"Response cache stats write failed: {e}")
+            with self._lock:  # keep them for the next flush
+                for name, n in pending.items():
+                    self._pending[name] += n
+
+    def _evict(self, conn):
+        """Drops expired rows, then the least recently used rows until the byte budget fits."""
+        now = time.time()
+        conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC"):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    # --- Memory Tier ---
+    def _remember(self, key, value, expires_at):
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    # --- Public API ---
+    def get(self, key):
+        """Returns the cached value for `key`, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                else:
+                    del self._memory[key]
+                    entry = None
+        if entry is not None:
+            self._count("hits")
+            return entry[1]
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            print(f"Response cache read failed: {e}")
+            row = None
+        self._count("hits" if row is not None else "misses")
+        if row is None:
+            return None
+        self._remember(key, row[0], row[1])
+        return row[0]
+
+    def set(self, key, value):
+        """Stores `value` in both tiers."""
+        now = time.time()
+        expires_at = now + self.ttl
+        self._remember(key, value, expires_at)
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), expires_at, now),
+            )
+            with self._lock:
+                self._writes += 1
+                sweep = self._writes % EVICTION_INTERVAL == 0
+            if sweep:
+                self._evict(conn)
+        except sqlite3.Error as e:
+            print(f"Response cache write failed: {e}")
+
+    def delete(self, key):
+        """Drops `key` from both tiers."""
+        with self._lock:
+            self._memory.pop(key, None)
+        try:
+            self._connect().execute("DELETE FROM responses WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            print(f"Response cache delete failed: {e}")
+
+    def stats(self):
+        """
+        Returns hit/miss counts (shared by all processes, plus this one's unflushed counts)
+        and the size of each tier. The disk totals are re-counted every STATS_FLUSH_SECONDS.
+        """
+        now = time.time()
+        with self._lock:
+            memory_entries = len(self._memory)
+            pending = dict(self._pending)
+            totals = self._totals
+        try:
+            conn = self._connect()
+            counts = dict(conn.execute("SELECT name, count FROM stats").fetchall())
+            if totals is None or now - totals[0] >= STATS_FLUSH_SECONDS:
+                totals = (now, *conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone())
+                with self._lock:
+                    self._totals = totals
+        except sqlite3.Error:
+            counts = {}
+            totals = totals or (now, 0, 0)
+        _, disk_entries, disk_bytes = totals
+        return {
+            "hits": counts.get("hits", 0) + pending["hits"],
+            "misses": counts.get("misses", 0) + pending["misses"],
+            "memory_entries": memory_entries,
+            "disk_entries": disk_entries,
+            "disk_bytes": disk_bytes,
+        }
+
+
+# --- Process-wide Instance ---
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Returns the cache shared by every page in this process."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+                atexit.register(_cache.flush_stats)
+    return _cache
+
+
+def _is_valid(validate, text):
+    try:
+        validate(text)
+    except Exception:
+        return False
+    return True
+
+
+def cached_generate_content(model, prompt, generation_config=None, request_options=None, validate=None):
+    """
+    Drop-in replacement for `model.generate_content(prompt).text`.
+    Returns the cached text when available, otherwise calls the model and stores the result.
+    `validate(text)` raises for a reply the caller cannot use (e.g. truncated JSON); such a
+    reply is raised to the caller instead of being stored, and a stored one is fetched again.
+    """
+    cache = get_response_cache()
+    key = make_cache_key(model.model_name, prompt, generation_config)
+    cached = cache.get(key)
+    if cached is not None and validate is not None and not _is_valid(validate, cached):
+        cache.delete(key)  # stored before it was validated
+        cached = None
+    record_cache(cached is not None)
+    if cached is not None:
+        return cached
+    response = model.generate_content(prompt, generation_config=generation_config, request_options=request_options)
+    text = response.text
+    record_payload(sent=len(prompt.encode("utf-8")), received=len(text.encode("utf-8")))
+    if validate is not None:
+        validate(text)
+    if text:  # an empty or blocked reply would otherwise be served to every later identical prompt
+        cache.set(key, text)
+    return text
+
+
+def cached_stream_content(model, prompt, generation_config=None, request_options=None):
+    """
+    Streaming twin of `cached_generate_content`.
+    Yields text chunks as `generate_content(stream=True)` produces them and stores the
+    joined text once the stream completes. A cache hit is yielded as a single chunk.
+    """
+    cache = get_response_cache()
+    key = make_cache_key(model.model_name, prompt, generation_config)
+    cached = cache.get(key)
+    record_cache(cached is not None)
+    if cached is not None:
+        yield cached
+        return
+    response = model.generate_content(
+        prompt, generation_config=generation_config, request_options=request_options, stream=True
+    )
+    parts = []
+    for chunk in response:
+        try:
+            text = chunk.text
+        except ValueError:
+            # Chunks that only carry finish/safety metadata have no text part
+            continue
+        if text:
+            parts.append(text)
+            yield text
+    # Only a stream that ran to completion is worth caching
+    text = "".join(parts)
+    record_payload(sent=len(prompt.encode("utf-8")), received=len(text.encode("utf-8")))
+    record_usage(getattr(response, "usage_metadata", None))
+    if text:
+        cache.set(key, text)
+
+
+def format_cache_stats():
+    """One-line summary of the cache counters for a sidebar caption."""
+    stats = get_response_cache().stats()
+    return f"⚡ Response cache: {stats['hits']} hits · {stats['misses']} misses · {stats['disk_entries']} stored"
@@ -0,0 +1,90 @@
+# utils/retrieval.py
+import math
+import re
+from collections import Counter, defaultdict
+
+# --- Retrieval Settings ---
+CHUNK_WORDS = 200     # words per chunk
+CHUNK_OVERLAP = 40    # words shared by neighbouring chunks so answers are not cut in half
+TOP_K = 6             # chunks sent to the model per question
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have he her his i in is it its of on or our she
+so that the their them they this to was we were what when where which who will with you your
+""".split())
+
+
+def tokenize(text):
+    """Lower-cased word tokens without the most common English stopwords."""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def format_source(kind, first, last):
+    """'Page 3' for a single record, 'Pages 3-4' for a range."""
+    if first == last:
+        return f"{kind} {first}"
+    return f"{kind}s {first}-{last}"
+
+
+def _make_chunk(window):
+    kind, first = window[0][1], window[0][2]
+    last = max(number for _, k, number in window if k == kind)
+    return {"text": " ".join(word for word, _, _ in window), "source": format_source(kind, first, last)}
+
+
+def chunk_records(records, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """
+    Splits extracted records into overlapping word windows.
+    `records` is an iterable of (kind, number, text) such as ("Page", 3, "...").
+    Each chunk remembers the page/slide range it came from.
+    """
+    chunks = []
+    window = []  # (word, kind, number)
+    for kind, number, text in records:
+        for word in text.split():
+            window.append((word, kind, number))
+            if len(window) >= chunk_words:
+                chunks.append(_make_chunk(window))
+                window = window[-overlap:] if overlap else []
+    # The leftover words are only new if they go beyond the overlap we already emitted
+    if window and (not chunks or len(window) > overlap):
+        chunks.append(_make_chunk(window))
+    return chunks
+
+
+class BM25Index:
+    """In-memory inverted index over document chunks with Okapi BM25 scoring."""
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)  # term -> [(chunk_id, term_frequency)]
+        self.lengths = []
+        for chunk_id, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk["text"]))
+            self.lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings[term].append((chunk_id, tf))
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        total = len(chunks)
+        self.idf = {
+            term: math.log(1 + (total - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in self.postings.items()
+        }
+
+    def search(self, query, k=TOP_K):
+        """Returns up to `k` chunks, best first. Falls back to the opening chunks when nothing matches."""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for chunk_id, tf in self.postings[term]:
+                norm = 1 - self.b + self.b * self.lengths[chunk_id] / (self.avg_length or 1)
+                scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        if not scores:
+            return self.chunks[:k]
+        best = sorted(scores, key=lambda chunk_id: (-scores[chunk_id], chunk_id))[:k]
+        return [self.chunks[chunk_id] for chunk_id in best]
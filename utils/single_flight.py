@@ -0,0 +1,169 @@
+# utils/single_flight.py
+import threading
+from concurrent.futures import Future
+
+from utils.metrics import register_collector
+
+_instances = {}  # name -> SingleFlight, for the metrics endpoint
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight calls. The first caller for a key (the leader) runs
+    the function; everyone who asks for the same key while it is running waits on the
+    leader's future and gets the same result or exception. Nothing is kept once the
+    call finishes, so this complements the response cache rather than replacing it:
+    it also helps on a cold cache, when a burst of identical requests arrives at once.
+    Streamlit runs every session as a thread of one server process, so one instance
+    per process covers all sessions. stream() does the same for streaming calls.
+    A named instance reports how many callers it coalesced at /metrics.
+    """
+
+    def __init__(self, name=None):
+        self._calls = {}
+        self._streams = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0  # callers that were served by someone else's request
+        if name:
+            _instances[name] = self
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stream(self, key, fn):
+        """
+        Like do() for a streaming call: fn() starts the request and returns an iterable of
+        chunks. Callers that join while it is being read replay the chunks read so far, then
+        continue with the live ones. Returns an iterable with the upstream's usage_metadata
+        for the leader only, so tokens are counted once.
+        """
+        with self._lock:
+            shared = self._streams.get(key)
+            leader = shared is None
+            if leader:
+                shared = self._streams[key] = _SharedStream()
+            else:
+                self.coalesced += 1
+        if leader:
+            try:
+                shared.response.set_result(fn())
+            except BaseException as e:
+                shared.response.set_exception(e)
+                self._forget(key, shared)
+                raise
+        return _Replay(self, key, shared, leader)
+
+    def _forget(self, key, shared):
+        with self._lock:
+            if self._streams.get(key) is shared:
+                del self._streams[key]
+
+    def _join(self, shared):
+        with self._lock:
+            shared.readers += 1
+
+    def _leave(self, key, shared):
+        with self._lock:
+            shared.readers -= 1
+            last = shared.readers == 0
+        if last or shared.finished:
+            # Nobody is reading any more, or there is nothing left to read: later callers start afresh
+            self._forget(key, shared)
+
+
+def _collect():
+    return [("app_coalesced_calls_total", "counter", "Callers served by an identical request already in flight.",
+             [({"target": name}, flight.coalesced) for name, flight in sorted(_instances.items())])]
+
+
+register_collector(_collect)
+
+
+_END = object()
+
+
+class _SharedStream:
+    """One upstream stream read by several callers; whoever needs the next chunk first reads it."""
+
+    def __init__(self):
+        self.response = Future()
+        self.chunks = []
+        self.finished = False
+        self.readers = 0
+        self._error = None
+        self._iterator = None
+        self._read_lock = threading.Lock()
+
+    def chunk(self, index):
+        """Returns chunk `index`, reading it from upstream if nobody has yet, or _END."""
+        if index < len(self.chunks):
+            return self.chunks[index]
+        with self._read_lock:
+            if index < len(self.chunks):
+                return self.chunks[index]
+            if self._error is not None:
+                raise self._error
+            if self.finished:
+                return _END
+            if self._iterator is None:
+                self._iterator = iter(self.response.result())
+            try:
+                chunk = next(self._iterator)
+            except StopIteration:
+                self.finished = True
+                return _END
+            except BaseException as e:
+                self._error = e
+                self.finished = True
+                raise
+            self.chunks.append(chunk)
+            return chunk
+
+
+class _Replay:
+    """One caller's view of a shared stream."""
+
+    def __init__(self, flight, key, shared, leader):
+        self._flight = flight
+        self._key = key
+        self._shared = shared
+        self._leader = leader
+
+    def __iter__(self):
+        self._flight._join(self._shared)
+        try:
+            index = 0
+            while True:
+                chunk = self._shared.chunk(index)
+                if chunk is _END:
+                    return
+                yield chunk
+                index += 1
+        finally:
+            self._flight._leave(self._key, self._shared)
+
+    @property
+    def usage_metadata(self):
+        if not self._leader:
+            return None
+        return getattr(self._shared.response.result(), "usage_metadata", None)
@@ -0,0 +1,184 @@
+# utils/summarizer.py
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils.doc_store import load_document
+from utils.gemini_client import generate_text, stream_text
+from utils.jobs import JobCancelled
+from utils.metrics import propagate
+
+# --- Summarizer Settings (override through .env) ---
+CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "12000"))    # input budget per map call
+REDUCE_TOKENS = int(os.getenv("SUMMARY_REDUCE_TOKENS", "24000"))  # input budget per reduce call
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "4"))
+MAX_REDUCE_ROUNDS = 4  # safety net in case partial summaries stop shrinking
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token) that needs no API round-trip."""
+    return len(text) // 4 + 1
+
+
+def split_into_chunks(text, max_tokens=CHUNK_TOKENS):
+    """Packs paragraphs into chunks under `max_tokens`; oversized paragraphs are split on words."""
+    max_chars = max_tokens * 4
+    chunks, current, size = [], [], 0
+    for para in text.split("\n"):
+        pieces = [para]
+        if len(para) > max_chars:
+            words = para.split()
+            pieces, piece, piece_size = [], [], 0
+            for word in words:
+                if piece and piece_size + len(word) + 1 > max_chars:
+                    pieces.append(" ".join(piece))
+                    piece, piece_size = [], 0
+                piece.append(word)
+                piece_size += len(word) + 1
+            if piece:
+                pieces.append(" ".join(piece))
+        for piece in pieces:
+            if current and size + len(piece) + 1 > max_chars:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+# --- Prompts ---
+def build_summary_prompt(text):
+    return f"You are an expert summarizer. Please provide a detailed yet concise summary of the following document text, highlighting the key points, main arguments, and any conclusions.\n\nDOCUMENT TEXT:\n---\n{text}\n---"
+
+
+def build_chunk_prompt(text, index, total):
+    return (
+        f"You are an expert summarizer. The following text is part {index + 1} of {total} of a longer document. "
+        "Summarize it faithfully, keeping every key point, argument, figure and conclusion it contains, "
+        "so the partial summaries can later be merged.\n\n"
+        f"DOCUMENT PART:\n---\n{text}\n---"
+    )
+
+
+def build_combine_prompt(partial_summaries, final=True):
+    joined = "\n\n".join(f"PART {i + 1}:\n{summary}" for i, summary in enumerate(partial_summaries))
+    if final:
+        task = ("Please merge them into one detailed yet concise summary of the whole document, "
+                "highlighting the key points, main arguments, and any conclusions.")
+    else:
+        task = "Please merge them into one summary that keeps every key point, argument and conclusion."
+    return (
+        "You are an expert summarizer. Below are summaries of consecutive parts of one document, in order. "
+        f"{task}\n\nPARTIAL SUMMARIES:\n---\n{joined}\n---"
+    )
+
+
+# --- Map-Reduce Engine ---
+def _run_parallel(prompts, max_workers, on_done):
+    """Runs the prompts concurrently and returns the results in input order."""
+    results = [None] * len(prompts)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(prompts)))) as executor:
+        futures = {executor.submit(propagate(generate_text), prompt): i for i, prompt in enumerate(prompts)}
+        try:
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                on_done(futures[future])
+        except BaseException:
+            # Failed or cancelled: don't start chunks nobody will read
+            executor.shutdown(cancel_futures=True)
+            raise
+    return results
+
+
+def _group_by_budget(summaries, max_tokens):
+    groups, current, size = [], [], 0
+    for summary in summaries:
+        tokens = estimate_tokens(summary)
+        if current and size + tokens > max_tokens:
+            groups.append(current)
+            current, size = [], 0
+        current.append(summary)
+        size += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def prepare_final_prompt(text, max_workers=SUMMARY_WORKERS, on_progress=None):
+    """
+    Map step: summarizes token-bounded chunks concurrently.
+    Reduce step: merges partial summaries in as many rounds as it takes to fit one call.
+    Returns the prompt for that last call, so callers can either stream it or wait for it.
+    `on_progress(stage, done, total)` is called from the caller's thread after every request.
+    """
+    chunks = split_into_chunks(text)
+    if len(chunks) <= 1:
+        return build_summary_prompt(text)
+
+    def report(stage, total):
+        done = [0]
+        def on_done(_):
+            done[0] += 1
+            if on_progress:
+                on_progress(stage, done[0], total)
+        return on_done
+
+    prompts = [build_chunk_prompt(chunk, i, len(chunks)) for i, chunk in enumerate(chunks)]
+    summaries = _run_parallel(prompts, max_workers, report("map", len(prompts)))
+
+    round_number = 0
+    while True:
+        groups = _group_by_budget(summaries, REDUCE_TOKENS)
+        if len(groups) == 1 or round_number == MAX_REDUCE_ROUNDS:
+            return build_combine_prompt(summaries)
+        round_number += 1
+        prompts = [build_combine_prompt(group, final=False) for group in groups]
+        summaries = _run_parallel(prompts, max_workers, report(f"reduce {round_number}", len(prompts)))
+
+
+def summarize_text_with_gemini(text, max_workers=SUMMARY_WORKERS, on_progress=None):
+    try:
+        final_prompt = prepare_final_prompt(text, max_workers, on_progress)
+        return generate_text(final_prompt)
+    except Exception as e:
+        return f"An error occurred with the Gemini API: {e}"
+
+
+def stream_summary_with_gemini(text, max_workers=SUMMARY_WORKERS, on_progress=None):
+    """Runs the map/reduce rounds, then yields the final summary chunk by chunk."""
+    final_prompt = prepare_final_prompt(text, max_workers, on_progress)
+    yield from stream_text(final_prompt)
+
+
+# --- Background Job (submitted by the Document Q&A page through utils.jobs) ---
+def run_summary_job(job, uploaded_file, page_range=None, max_workers=SUMMARY_WORKERS, stream=True):
+    """
+    Reads the upload and summarizes it, reporting chunk progress and, when `stream` is on,
+    publishing the final summary as it is written. Returns the summary text. An unreadable
+    file or a Gemini error fails the job with its message, so the page shows it as an error.
+    """
+    job.report(0, 1, "Reading your document...")
+    document = load_document(uploaded_file, page_range)
+    if isinstance(document, str):
+        raise ValueError(document)
+
+    def show_chunk_progress(stage, done, total):
+        label = "Summarizing chunk" if stage == "map" else f"Merging summaries ({stage})"
+        job.report(done, total, f"{label} {done}/{total}")
+
+    job.report(0, 1, "Preparing summary...")
+    try:
+        if not stream:
+            final_prompt = prepare_final_prompt(document["text"], max_workers, show_chunk_progress)
+            return generate_text(final_prompt)
+        parts = []
+        for chunk in stream_summary_with_gemini(document["text"], max_workers, on_progress=show_chunk_progress):
+            parts.append(chunk)
+            job.report(1, 1, "Writing the summary...")
+            job.publish("".join(parts))
+        return "".join(parts)
+    except JobCancelled:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"An error occurred with the Gemini API: {e}") from e
@@ -0,0 +1,278 @@
+# utils/translation.py
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils.gemini_client import generate_text
+from utils.metrics import propagate
+from utils.response_cache import CACHE_DIR
+
+# --- Translation Settings (override through .env) ---
+TRANSLATION_MEMORY_PATH = os.path.join(CACHE_DIR, "translation_memory.sqlite3")
+BATCH_MAX_CHARS = int(os.getenv("TRANSLATION_BATCH_MAX_CHARS", "6000"))  # source text per request
+TRANSLATION_WORKERS = int(os.getenv("TRANSLATION_WORKERS", "4"))
+MULTI_TARGET_WORKERS = int(os.getenv("MULTI_TARGET_WORKERS", "10"))  # target languages translated at once
+
+# Sentence ends (Latin, CJK, Devanagari danda, Arabic question mark) and line breaks.
+# The separators are captured so the translation can be reassembled with the original layout.
+SEGMENT_BOUNDARY = re.compile(r"(\n+|(?<=[.!?।؟])[ \t]+|(?<=[。！？]))")
+SEGMENT_MARKER = re.compile(r"<<<(\d+)>>>[ \t]*\n?(.*?)(?=\n?<<<\d+>>>|\Z)", re.DOTALL)
+MARKER_TAG = re.compile(r"<<<\d+>>>[ \t]*\n?")  # a marker on its own, as the model may echo it
+
+
+def split_segments(text):
+    """Splits text into [(segment, separator)] pairs; joining them gives back the original text."""
+    parts = SEGMENT_BOUNDARY.split(text)
+    if len(parts) % 2:
+        parts.append("")
+    return [(parts[i], parts[i + 1]) for i in range(0, len(parts), 2)]
+
+
+def segment_hash(segment):
+    return hashlib.sha256(segment.strip().encode("utf-8")).hexdigest()
+
+
+# --- Translation Memory (persistent, shared by every worker process) ---
+class TranslationMemory:
+    """Segment translations keyed by (segment hash, source language, target language), stored in SQLite."""
+
+    def __init__(self, path=TRANSLATION_MEMORY_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS segments (
+                       segment_hash TEXT NOT NULL,
+                       source_lang TEXT NOT NULL,
+                       target_lang TEXT NOT NULL,
+                       translation TEXT NOT NULL,
+                       updated REAL NOT NULL,
+                       PRIMARY KEY (segment_hash, source_lang, target_lang)
+                   )"""
+            )
+            self._local.conn = conn
+        return conn
+
+    def lookup(self, hashes, source_lang, target_lang):
+        """Returns {segment_hash: translation} for the hashes already in memory."""
+        found = {}
+        try:
+            conn = self._connect()
+            unique = list(set(hashes))
+            for i in range(0, len(unique), 500):  # stay under SQLite's variable limit
+                batch = unique[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT segment_hash, translation FROM segments WHERE source_lang = ? AND target_lang = ? "
+                    f"AND segment_hash IN ({','.join('?' * len(batch))})",
+                    [source_lang, target_lang, *batch],
+                )
+                found.update(rows)
+        except sqlite3.Error as e:
+            print(f"Translation memory read failed: {e}")
+        return found
+
+    def store(self, pairs, source_lang, target_lang, reverse=False):
+        """
+        Stores {source_segment: translation}. With `reverse`, also stores the opposite direction
+        so '⇄' swaps come back free; only do that when the user chose `source_lang`, since a
+        detected language can be wrong and would then poison the other direction.
+        """
+        now = time.time()
+        rows = [(segment_hash(src), source_lang, target_lang, dst, now) for src, dst in pairs.items()]
+        if reverse:
+            rows += [(segment_hash(dst), target_lang, source_lang, src, now) for src, dst in pairs.items()]
+        try:
+            self._connect().executemany("INSERT OR REPLACE INTO segments VALUES (?, ?, ?, ?, ?)", rows)
+        except sqlite3.Error as e:
+            print(f"Translation memory write failed: {e}")
+
+
+_memory = None
+_memory_lock = threading.Lock()
+
+
+def get_translation_memory():
+    global _memory
+    if _memory is None:
+        with _memory_lock:
+            if _memory is None:
+                _memory = TranslationMemory()
+    return _memory
+
+
+# --- Batched Requests ---
+def build_batch_prompt(segments, source_lang, target_lang):
+    marked = "\n".join(f"<<<{i}>>>\n{segment}" for i, segment in enumerate(segments, start=1))
+    if source_lang == "Auto-Detect":
+        task = f"Identify the language of each segment and translate it into {target_lang}."
+    else:
+        task = f"Translate each segment from {source_lang} into {target_lang}."
+    return f"""
+        You are an expert translator. {task}
+        The segments are numbered with markers like <<<1>>>. Return every marker exactly as given, in the same order,
+        each followed on the next line by the translation of that segment only. Translate each segment on its own.
+        Do not add any explanations, introductions, or any other text in your response.
+
+        Segments:
+        {marked}
+        """
+
+
+def parse_batch_response(text, count):
+    """Returns {index: translation} for the markers found in the model's reply."""
+    found = {}
+    for number, translation in SEGMENT_MARKER.findall(text):
+        index = int(number) - 1
+        if 0 <= index < count and translation.strip():
+            found[index] = translation.strip()
+    return found
+
+
+def _translate_batch(segments, source_lang, target_lang):
+    reply = generate_text(build_batch_prompt(segments, source_lang, target_lang))
+    found = parse_batch_response(reply, len(segments))
+    if len(found) == len(segments):
+        return [found[i] for i in range(len(segments))]
+    if len(segments) == 1:
+        # A lone segment that came back without a usable marker is still its translation,
+        # minus any stray marker the model echoed
+        return [MARKER_TAG.sub("", reply).strip()]
+    # The model merged or dropped markers: retry the missing segments one by one
+    return [found[i] if i in found else _translate_batch([segment], source_lang, target_lang)[0]
+            for i, segment in enumerate(segments)]
+
+
+def _make_batches(segments, max_chars=BATCH_MAX_CHARS):
+    batches, current, size = [], [], 0
+    for segment in segments:
+        if current and size + len(segment) > max_chars:
+            batches.append(current)
+            current, size = [], 0
+        current.append(segment)
+        size += len(segment)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def translate_segments(segments, source_lang, target_lang, max_workers=TRANSLATION_WORKERS, remember_reverse=False):
+    """
+    Translates a list of segments, sending only those the translation memory has not seen.
+    New segments are de-duplicated, batched into marker-delimited requests that run in parallel,
+    and written back to memory. Pass remember_reverse=True only when the user picked the source
+    language (not when it was detected) to also remember the reverse direction.
+    Returns (translations, reused_count).
+    """
+    memory = get_translation_memory()
+    hashes = [segment_hash(segment) for segment in segments]
+    known = memory.lookup(hashes, source_lang, target_lang)
+    reused = sum(1 for digest in hashes if digest in known)
+
+    missing, seen = [], set()
+    for segment, digest in zip(segments, hashes):
+        if digest not in known and digest not in seen:
+            seen.add(digest)
+            missing.append(segment.strip())
+    if missing:
+        batches = _make_batches(missing)
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as executor:
+            results = list(executor.map(propagate(lambda batch: _translate_batch(batch, source_lang, target_lang)), batches))
+        fresh = {src: dst for batch, out in zip(batches, results) for src, dst in zip(batch, out)}
+        # An empty reply is used this once but not remembered, so the next request retries it
+        memory.store({src: dst for src, dst in fresh.items() if dst}, source_lang, target_lang, reverse=remember_reverse)
+        known.update({segment_hash(src): dst for src, dst in fresh.items()})
+
+    return [known[digest] for digest in hashes], reused
+
+
+def translate_with_memory(source_text, source_lang, target_lang, remember_reverse=False):
+    """
+    Incremental translation of a whole text. Returns {"text", "segments", "reused"}:
+    editing one sentence of a long text only sends that sentence. See translate_segments for remember_reverse.
+    """
+    pairs = split_segments(source_text)
+    translatable = [(i, segment) for i, (segment, _) in enumerate(pairs) if segment.strip()]
+    translations, reused = translate_segments([segment for _, segment in translatable], source_lang, target_lang,
+                                              remember_reverse=remember_reverse)
+    by_index = dict(zip((i for i, _ in translatable), translations))
+
+    out = []
+    for i, (segment, separator) in enumerate(pairs):
+        if i in by_index:
+            lead = segment[:len(segment) - len(segment.lstrip())]
+            trail = segment[len(segment.rstrip()):]
+            out.append(lead + by_index[i] + trail)
+        else:
+            out.append(segment)
+        out.append(separator)
+    return {"text": "".join(out).strip(), "segments": len(translatable), "reused": reused}
+
+
+# --- Fan-out to Several Target Languages ---
+def iter_multi_target(source_text, source_lang, target_langs, max_workers=MULTI_TARGET_WORKERS, remember_reverse=False):
+    """
+    Translates one text into every language in `target_langs` concurrently and yields
+    (target_lang, result) pairs in the order they finish. A result is the
+    translate_with_memory dict, or an "An error occurred ..." string for that language alone.
+    """
+    if not target_langs:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(target_langs)))) as executor:
+        futures = {
+            executor.submit(propagate(translate_with_memory), source_text, source_lang, target_lang,
+                            remember_reverse=remember_reverse): target_lang
+            for target_lang in target_langs
+        }
+        try:
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result()
+                except Exception as e:
+                    yield futures[future], f"An error occurred during translation: {e}"
+        except GeneratorExit:
+            # The reader stopped early (e.g. a cancelled job): skip the languages not started yet
+            executor.shutdown(cancel_futures=True)
+            raise
+
+
+def translate_into_many(job, source_text, source_lang, target_langs, remember_reverse=False):
+    """
+    Background job for the Translator's multi-language mode: publishes {lang: text} as each
+    language lands and returns it in the order of `target_langs`. Failed languages carry
+    their "An error occurred ..." string.
+    """
+    results = {}
+    job.report(0, len(target_langs), "Translating...")
+    translated = iter_multi_target(source_text, source_lang, target_langs, remember_reverse=remember_reverse)
+    for done, (lang, result) in enumerate(translated, start=1):
+        results[lang] = result if isinstance(result, str) else result["text"]
+        job.publish(dict(results))
+        job.report(done, len(target_langs), f"{done} of {len(target_langs)} languages done")
+    # Keep the tab order the user chose, not the order the results arrived in
+    return {lang: results[lang] for lang in target_langs}
+
+
+def combine_translations(translations):
+    """One plain-text document with a headed section per language, for the combined download."""
+    return "\n\n".join(f"===== {lang} =====\n{text}" for lang, text in translations.items()) + "\n"
+
+
+# --- The Core Translation Function ---
+def translate_text_with_gemini(source_text, source_lang, target_lang):
+    """
+    Uses the Gemini API to translate text between any two languages.
+    """
+    try:
+        return translate_with_memory(source_text, source_lang, target_lang)["text"]
+    except Exception as e:
+        return f"An error occurred during translation: {e}"